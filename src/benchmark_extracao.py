@@ -0,0 +1,378 @@
+import io
+import os
+import re
+import sys
+import json
+import math
+import time
+import argparse
+import random
+import platform
+import tempfile
+import importlib
+import statistics
+import subprocess
+import contextlib
+
+# --- Benchmark da extração ---
+# Roda a análise do documento principal de cada subpasta do corpus (por padrão `arquivos_teste`),
+# sem cache, e mede throughput (docs/s, páginas/s), latência por documento (p50/p95) e o tempo de
+# cada etapa: abertura, blocos (decodificação/ordenação), metadados (regex), admissibilidade,
+# pontuação e exportação (montagem das linhas + planilha). O resultado sai em JSON; com --comparar,
+# é conferido contra um JSON anterior e o processo termina com código 1 se houver regressão.
+# Com --valores, confere o conversor rápido de valores (valores_monetarios.valor_do_match) contra o
+# original em todo valor em R$ do corpus e em textos sintéticos, e mede o custo por valor; termina com
+# código 1 se houver divergência. Com --palavras-chave, confere da mesma forma o motor de palavras-chave
+# (motor_palavras_chave.analisar_linha) contra o laço original com um re.search por palavra-chave. Com --importacao, mede com `-X importtime` o tempo de importação dos
+# extratores (limite de LIMITE_IMPORTACAO_MS, sem carregar MODULOS_PESADOS) e termina com código 1 se estourar.
+PASTA_CORPUS_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'arquivos_teste')
+VARIANTES = {"noAI": "extractor_noAI", "color": "extractor_noAI_color"}
+ETAPAS = ["abertura", "blocos", "metadados", "admissibilidade", "pontuacao", "exportacao"]
+TOLERANCIA_PADRAO = 0.15
+MODULOS_NUCLEO = ["extractor_noAI", "extractor_noAI_color", "extractor_IA"]
+MODULOS_PESADOS = ["pandas", "numpy", "fitz", "docx", "openpyxl", "llama_cpp"]
+LIMITE_IMPORTACAO_MS = 100
+
+def percentil(valores, p):
+    """Percentil pelo método do posto mais próximo (`valores` não vazio)."""
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+def listar_corpus(extrator, pasta_corpus):
+    """(subpasta, caminho do documento principal ou None) de cada subpasta, na ordem do pipeline."""
+    corpus = []
+    for nome in os.listdir(pasta_corpus):
+        caminho_subpasta = os.path.join(pasta_corpus, nome)
+        if not os.path.isdir(caminho_subpasta): continue
+        documentos = extrator.listar_documentos(caminho_subpasta)
+        corpus.append((nome, os.path.join(caminho_subpasta, documentos[0]) if documentos else None))
+    return corpus
+
+def contar_paginas(caminho_documento):
+    import fitz
+    if not caminho_documento.lower().endswith('.pdf'): return 1
+    try:
+        with fitz.open(caminho_documento) as pdf_doc: return len(pdf_doc)
+    except Exception: return 0
+
+def executar_rodada(extrator, pasta_corpus, corpus, diretorio_saida):
+    """Uma passada completa pelo corpus. Retorna (tempo total, latências por documento, tempos por etapa)."""
+    tempos, latencias, resultados = {etapa: 0.0 for etapa in ETAPAS}, {}, {}
+    inicio_rodada = time.perf_counter()
+    for nome, caminho in corpus:
+        if caminho is None: continue
+        inicio = time.perf_counter()
+        analise = extrator.analisar_documento(caminho, tempos)
+        latencias[nome] = time.perf_counter() - inicio
+        metadados = {"nome_subpasta_original": nome, "nome_arquivo_original": os.path.basename(caminho), "status_admissibilidade": "Indeterminado"}
+        if analise is not None:
+            metadados.update(analise["metadados_documento"], status_admissibilidade=analise["status_admissibilidade"])
+        extrator.inferir_natureza_pela_pasta(metadados, pasta_corpus)
+        resultados[nome] = {
+            "metadados": metadados, "valores_extraidos": analise and analise["valores_extraidos"], "valor_numerico": analise and analise["valor_numerico"],
+            "criterio_usado": analise["criterio_usado"] if analise else "erro_leitura_conteudo"
+        }
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        extrator.exportar_para_excel(resultados, os.path.join(diretorio_saida, "benchmark"))
+    extrator.registrar_tempo(tempos, "exportacao", inicio)
+    return time.perf_counter() - inicio_rodada, latencias, tempos
+
+def obter_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except Exception: return None
+
+def executar_benchmark(variante="noAI", pasta_corpus=PASTA_CORPUS_PADRAO, repeticoes=3, aquecimento=1):
+    """
+    Roda `aquecimento` + `repeticoes` passadas e resume as medidas: tempo total e tempo por etapa são
+    a mediana das repetições; a latência de cada documento é a menor observada (menos ruído do sistema).
+    """
+    import fitz
+    extrator = importlib.import_module(VARIANTES[variante])
+    corpus = listar_corpus(extrator, pasta_corpus)
+    documentos = [caminho for _, caminho in corpus if caminho]
+    paginas = sum(contar_paginas(caminho) for caminho in documentos)
+
+    totais, latencias_por_doc, tempos_por_etapa = [], {}, {etapa: [] for etapa in ETAPAS}
+    with tempfile.TemporaryDirectory() as diretorio_saida:
+        for rodada in range(aquecimento + repeticoes):
+            total, latencias, tempos = executar_rodada(extrator, pasta_corpus, corpus, diretorio_saida)
+            if rodada < aquecimento: continue
+            totais.append(total)
+            for nome, latencia in latencias.items(): latencias_por_doc[nome] = min(latencia, latencias_por_doc.get(nome, math.inf))
+            for etapa in ETAPAS: tempos_por_etapa[etapa].append(tempos[etapa])
+
+    tempo_total = statistics.median(totais)
+    etapas = {etapa: statistics.median(valores) for etapa, valores in tempos_por_etapa.items()}
+    latencias_ms = [latencia * 1000 for latencia in latencias_por_doc.values()]
+    return {
+        "variante": variante, "corpus": os.path.abspath(pasta_corpus), "commit": obter_commit(),
+        "ambiente": {"python": platform.python_version(), "pymupdf": fitz.VersionBind, "cpus": os.cpu_count(), "plataforma": platform.platform()},
+        "repeticoes": repeticoes, "subpastas": len(corpus), "documentos": len(documentos), "paginas": paginas,
+        "tempo_total_s": round(tempo_total, 4),
+        "docs_por_s": round(len(documentos) / tempo_total, 2), "paginas_por_s": round(paginas / tempo_total, 2),
+        "latencia_ms": {
+            "p50": round(percentil(latencias_ms, 50), 2), "p95": round(percentil(latencias_ms, 95), 2),
+            "max": round(max(latencias_ms), 2), "media": round(statistics.mean(latencias_ms), 2)
+        },
+        "etapas_s": {etapa: round(segundos, 4) for etapa, segundos in etapas.items()},
+        "etapas_pct": {etapa: round(100 * segundos / tempo_total, 1) for etapa, segundos in etapas.items()},
+    }
+
+def coletar_matches_valores(extrator, corpus):
+    """Todos os matches de PADROES_VALOR_REFINADOS nos parágrafos dos documentos do corpus."""
+    matches = []
+    for _, caminho in corpus:
+        documento = caminho and extrator.carregar_documento(caminho)
+        if not documento: continue
+        for paragrafo in documento["paragrafos"]:
+            for padrao in extrator.PADROES_VALOR_COMPILADOS: matches.extend(padrao.finditer(paragrafo.strip()))
+    return matches
+
+def gerar_textos_valores(quantidade, semente=0):
+    """Textos aleatórios com valores em R$ nas formas aceitas pelos padrões (separadores, unidades, espaços e sufixos variados)."""
+    aleatorio = random.Random(semente)
+    def numero():
+        grupos = [str(aleatorio.randint(1, 999))] + [f"{aleatorio.randint(0, 999):03d}" for _ in range(aleatorio.randint(0, 4))]
+        texto = grupos[0] + "".join(aleatorio.choice("._") + grupo for grupo in grupos[1:])
+        return texto + aleatorio.choice(["", "", f",{aleatorio.randint(0, 99):02d}", f",{aleatorio.randint(0, 9)}", f".{aleatorio.randint(0, 99)}"])
+    textos = []
+    for _ in range(quantidade):
+        unidade = aleatorio.choice(["", "", "mil", "milhões", "milhoes", "MILHÕES", "bilhões", "bi", "tri", "milhao"])
+        valor = (aleatorio.choice(["R$", "r$"]) + aleatorio.choice(["", " ", "  ", "\n"]) + numero()
+                 + (aleatorio.choice([" ", "", "\t", " \n"]) + unidade if unidade else "") + aleatorio.choice(["", " de reais", " DE  REAIS", " (cem)", "."]))
+        textos.append(f"{aleatorio.choice(['multa de ', 'no valor de ', ''])}{valor}{aleatorio.choice(['', ' ao erário', ', a ser pago'])}")
+    return textos
+
+def verificar_conversor_valores(matches):
+    """Matches em que `valor_do_match` difere do conversor original aplicado ao texto do match."""
+    from valores_monetarios import valor_do_match, _converter_texto
+    referencia = _converter_texto.__wrapped__  # sem memo
+    return [(match.group(0), valor_do_match(match), referencia(match.group(0))[0]) for match in matches if valor_do_match(match) != referencia(match.group(0))[0]]
+
+def medir_ns_por_chamada(funcao, argumentos, repeticoes=5):
+    """Menor tempo médio (ns) por chamada de `funcao` sobre `argumentos` em `repeticoes` passadas."""
+    melhor = math.inf
+    for _ in range(repeticoes):
+        inicio = time.perf_counter_ns()
+        for argumento in argumentos: funcao(argumento)
+        melhor = min(melhor, (time.perf_counter_ns() - inicio) / len(argumentos))
+    return round(melhor, 1)
+
+def executar_benchmark_valores(variante="noAI", pasta_corpus=PASTA_CORPUS_PADRAO, sinteticos=20000):
+    """
+    Confere `valor_do_match` contra o conversor original em todo valor em R$ do corpus e em textos
+    sintéticos, e mede o custo por valor: conversor original, conversão pelos grupos sem memo e com memo.
+    """
+    import valores_monetarios
+    extrator = importlib.import_module(VARIANTES[variante])
+    matches_corpus = coletar_matches_valores(extrator, listar_corpus(extrator, pasta_corpus))
+    matches_sinteticos = [m for texto in gerar_textos_valores(sinteticos) for padrao in extrator.PADROES_VALOR_COMPILADOS for m in padrao.finditer(texto)]
+    divergencias = verificar_conversor_valores(matches_corpus + matches_sinteticos)
+
+    textos = [match.group(0) for match in matches_corpus]
+    valores_monetarios._valor_dos_grupos.cache_clear()
+    sem_memo = valores_monetarios._valor_dos_grupos.__wrapped__
+    def pelos_grupos_sem_memo(match):
+        grupos = match.groupdict()
+        if grupos.get("value") is not None: return sem_memo(grupos["value"], None, False, False)
+        return sem_memo(grupos["number"], grupos["unit"].lower(), match.string[match.start("unit") - 1] == " ", match.end() > match.end("unit"))
+    return {
+        "variante": variante, "corpus": os.path.abspath(pasta_corpus), "commit": obter_commit(),
+        "valores_corpus": len(matches_corpus), "valores_distintos_corpus": len(set(textos)), "valores_sinteticos": len(matches_sinteticos),
+        "divergencias": [{"texto": texto, "novo": novo, "original": original} for texto, novo, original in divergencias[:20]],
+        "total_divergencias": len(divergencias),
+        "ns_por_valor": {
+            "original": medir_ns_por_chamada(valores_monetarios._converter_texto.__wrapped__, textos),
+            "grupos_sem_memo": medir_ns_por_chamada(pelos_grupos_sem_memo, matches_corpus),
+            "grupos_com_memo": medir_ns_por_chamada(valores_monetarios.valor_do_match, matches_corpus),
+        },
+    }
+
+def coletar_pares_linha_valor(extrator, corpus):
+    """(linha, valor numérico) de cada valor em R$ das linhas dos documentos do corpus, como em `coletar_candidatos`."""
+    from valores_monetarios import valor_do_match
+    pares = []
+    for _, caminho in corpus:
+        documento = caminho and extrator.carregar_documento(caminho)
+        if not documento: continue
+        for paragrafo in documento["paragrafos"]:
+            linha = paragrafo.strip()
+            for padrao in extrator.PADROES_VALOR_COMPILADOS: pares.extend((linha, valor_do_match(match)) for match in padrao.finditer(linha))
+    return pares
+
+def pontuar_por_palavra_chave(extrator, valor_numerico, texto_linha, is_in_decision_section):
+    """`calcular_score_valor` original, com um re.search por palavra-chave: a referência do motor de varredura única."""
+    score, best_keyword_category = 0.0, 'contexto_geral'
+    texto_linha_lower = texto_linha.lower()
+    if valor_numerico > 0: score += math.log10(valor_numerico + 1) / 10
+    for neg_kw_regex in extrator.PALAVRAS_CHAVE_NEGATIVAS:
+        if re.search(neg_kw_regex, texto_linha_lower): return 0.0, 'negativo'
+    max_keyword_weight = 0
+    for kw_regex, (peso, categoria) in extrator.PALAVRAS_CHAVE_PONDERADAS.items():
+        if re.search(kw_regex, texto_linha_lower):
+            score += peso
+            if peso > max_keyword_weight: max_keyword_weight = peso; best_keyword_category = categoria
+    if is_in_decision_section and best_keyword_category == 'sancao_direta': score += 1.0
+    return score, best_keyword_category
+
+# Trechos que casam com as palavras-chave ponderadas (e algumas negativas), para montar linhas densas:
+# poucas linhas do corpus têm muitas palavras-chave, mas são justamente as que trazem valores em R$.
+FRASES_PONDERADAS = [
+    "multa no valor de", "condeno ao pagamento de", "devolução da quantia de", "fixo a multa em", "valor da decisão",
+    "valor global estimado de", "preço global estimado de", "valor total do contrato", "proposta vencedora no valor de",
+    "valor do contrato nº 12/2023, no valor de", "valor estimado de", "dano ao erário de", "prejuízo aos cofres públicos de",
+    "no valor de", "valor total de", "montante de",
+]
+FRASES_NEGATIVAS = ["economia de", "valor da causa", "juros de", "custas processuais"]
+FRASES_NEUTRAS = ["conforme consta nos autos,", "referente ao exercício de 2023,", "em favor do município,", "e demais cominações legais,"]
+
+def gerar_linhas_densas(quantidade=200, semente=0, comprimento=600):
+    """Linhas de ~`comprimento` caracteres com muitas palavras-chave e valores em R$; ~1 em 10 traz uma negativa no fim."""
+    aleatorio = random.Random(semente)
+    linhas = []
+    for indice in range(quantidade):
+        trechos = []
+        while sum(len(trecho) + 1 for trecho in trechos) < comprimento:
+            trechos.append(f"{aleatorio.choice(FRASES_PONDERADAS)} R$ {aleatorio.randint(1, 999)}.{aleatorio.randint(0, 999):03d},{aleatorio.randint(0, 99):02d} {aleatorio.choice(FRASES_NEUTRAS)}")
+        if indice % 10 == 0: trechos.append(aleatorio.choice(FRASES_NEGATIVAS) + " R$ 1.000,00")
+        linhas.append(" ".join(trechos))
+    return linhas
+
+def executar_benchmark_palavras_chave(pasta_corpus=PASTA_CORPUS_PADRAO, tolerancia=TOLERANCIA_PADRAO):
+    """
+    Confere `calcular_score_valor` (motor de palavras-chave) contra `pontuar_por_palavra_chave` em todo
+    par (linha, valor) do corpus e de linhas densas sintéticas, com os pesos de cada variante e com e
+    sem seção de decisão (score e categoria têm de ser idênticos), e mede o custo por par de cada um
+    em cada conjunto. `lentidoes` lista os conjuntos em que o motor ficou mais lento que o original
+    além de `tolerancia`.
+    """
+    from valores_monetarios import valor_do_match
+    extratores = {variante: importlib.import_module(modulo) for variante, modulo in VARIANTES.items()}
+    conjuntos = {
+        "corpus": coletar_pares_linha_valor(extratores["noAI"], listar_corpus(extratores["noAI"], pasta_corpus)),
+        "densas": [(linha, valor_do_match(match)) for linha in gerar_linhas_densas()
+                   for padrao in extratores["noAI"].PADROES_VALOR_COMPILADOS for match in padrao.finditer(linha)],
+    }
+    divergencias, ns_por_par, lentidoes = [], {}, []
+    for variante, extrator in extratores.items():
+        ns_por_par[variante] = {}
+        for conjunto, pares in conjuntos.items():
+            for linha, valor in pares:
+                for secao_decisao in (False, True):
+                    novo, original = extrator.calcular_score_valor(valor, linha, secao_decisao), pontuar_por_palavra_chave(extrator, valor, linha, secao_decisao)
+                    if novo != original:
+                        divergencias.append({"variante": variante, "conjunto": conjunto, "linha": linha[:200], "valor": valor, "secao_decisao": secao_decisao, "novo": novo, "original": original})
+            argumentos = [(valor, linha, False) for linha, valor in pares]
+            medida = ns_por_par[variante][conjunto] = {
+                "original": medir_ns_por_chamada(lambda a: pontuar_por_palavra_chave(extrator, *a), argumentos),
+                "motor": medir_ns_por_chamada(lambda a: extrator.calcular_score_valor(*a), argumentos),
+            }
+            if medida["motor"] > medida["original"] * (1 + tolerancia):
+                lentidoes.append(f"{variante}/{conjunto}: motor {medida['motor']} ns/par contra {medida['original']} ns/par do original")
+    return {
+        "corpus": os.path.abspath(pasta_corpus), "commit": obter_commit(), "pares": {conjunto: len(pares) for conjunto, pares in conjuntos.items()},
+        "divergencias": divergencias[:20], "total_divergencias": len(divergencias), "ns_por_par": ns_por_par, "lentidoes": lentidoes,
+    }
+
+def medir_importacao(modulo, repeticoes=5):
+    """
+    Importa `modulo` num interpretador novo com `-X importtime`, `repeticoes` vezes, e fica com a
+    medida mais rápida: tempo total (ms), as importações mais caras e quais MODULOS_PESADOS foram carregados.
+    """
+    comando = f"import sys, {modulo}; print(','.join(m for m in {MODULOS_PESADOS!r} if m in sys.modules))"
+    melhor = None
+    for _ in range(repeticoes):
+        execucao = subprocess.run([sys.executable, "-X", "importtime", "-c", comando], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        acumulados = {}
+        for linha in execucao.stderr.splitlines():
+            campos = linha.removeprefix("import time:").split("|")
+            if not linha.startswith("import time:") or not campos[1].strip().isdigit(): continue
+            acumulados[campos[2].strip()] = int(campos[1]) / 1000
+        medida = {
+            "ms": round(acumulados[modulo], 1),
+            "mais_caras_ms": {nome: round(ms, 1) for nome, ms in sorted(acumulados.items(), key=lambda x: -x[1])[1:6]},
+            "pesados_importados": [m for m in execucao.stdout.strip().split(",") if m],
+        }
+        if melhor is None or medida["ms"] < melhor["ms"]: melhor = medida
+    return melhor
+
+def comparar_com_base(resultado, base, tolerancia=TOLERANCIA_PADRAO):
+    """Lista de regressões (vazia se nenhuma): throughput abaixo ou latência p95 acima da base além da tolerância."""
+    regressoes = []
+    for metrica in ["docs_por_s", "paginas_por_s"]:
+        if resultado[metrica] < base[metrica] * (1 - tolerancia):
+            regressoes.append(f"{metrica}: {resultado[metrica]} < {base[metrica]} (-{100 * (1 - resultado[metrica] / base[metrica]):.1f}%)")
+    p95, p95_base = resultado["latencia_ms"]["p95"], base["latencia_ms"]["p95"]
+    if p95 > p95_base * (1 + tolerancia):
+        regressoes.append(f"latencia p95: {p95} ms > {p95_base} ms (+{100 * (p95 / p95_base - 1):.1f}%)")
+    return regressoes
+
+def imprimir_resumo(resultado):
+    print(f"{resultado['variante']}: {resultado['documentos']} documentos, {resultado['paginas']} páginas em {resultado['tempo_total_s']:.2f}s "
+          f"({resultado['docs_por_s']} docs/s, {resultado['paginas_por_s']} páginas/s)")
+    print(f"  latência por documento: p50 {resultado['latencia_ms']['p50']} ms, p95 {resultado['latencia_ms']['p95']} ms, máx {resultado['latencia_ms']['max']} ms")
+    print("  etapas: " + ", ".join(f"{etapa} {resultado['etapas_s'][etapa]:.3f}s ({resultado['etapas_pct'][etapa]}%)" for etapa in ETAPAS))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark da extração sobre o corpus de teste.")
+    parser.add_argument("--variante", choices=VARIANTES, default="noAI", help="extrator medido (padrão: %(default)s)")
+    parser.add_argument("--pasta", default=PASTA_CORPUS_PADRAO, help="pasta raiz do corpus (padrão: arquivos_teste)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="passadas medidas pelo corpus (padrão: %(default)s)")
+    parser.add_argument("--aquecimento", type=int, default=1, help="passadas descartadas antes das medidas (padrão: %(default)s)")
+    parser.add_argument("--saida", help="grava o resultado em JSON neste arquivo")
+    parser.add_argument("--comparar", metavar="BASE_JSON", help="compara com um resultado anterior e sai com código 1 se houver regressão")
+    parser.add_argument("--valores", action="store_true", help="confere e mede o conversor de valores em R$ em vez da extração")
+    parser.add_argument("--palavras-chave", action="store_true", help="confere e mede o motor de palavras-chave contra o laço original, nas duas variantes")
+    parser.add_argument("--importacao", action="store_true", help=f"mede o tempo de importação dos extratores (limite {LIMITE_IMPORTACAO_MS} ms)")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO, help="variação aceita na comparação (padrão: %(default)s)")
+    args = parser.parse_args()
+
+    if args.valores:
+        resultado = executar_benchmark_valores(args.variante, args.pasta)
+        print(json.dumps(resultado, ensure_ascii=False, indent=2))
+        if resultado["total_divergencias"]:
+            print(f"DIVERGÊNCIA: {resultado['total_divergencias']} valores convertidos de forma diferente do conversor original.")
+            sys.exit(1)
+        print(f"Conversor equivalente ao original em {resultado['valores_corpus']} valores do corpus e {resultado['valores_sinteticos']} sintéticos.")
+        sys.exit(0)
+
+    if args.palavras_chave:
+        resultado = executar_benchmark_palavras_chave(args.pasta, args.tolerancia)
+        print(json.dumps(resultado, ensure_ascii=False, indent=2))
+        if resultado["total_divergencias"]:
+            print(f"DIVERGÊNCIA: {resultado['total_divergencias']} pontuações diferentes das do laço original por palavra-chave.")
+        for lentidao in resultado["lentidoes"]: print(f"LENTIDÃO (tolerância {args.tolerancia:.0%}): {lentidao}")
+        if resultado["total_divergencias"] or resultado["lentidoes"]: sys.exit(1)
+        pares = resultado["pares"]
+        print(f"Motor de palavras-chave equivalente ao original e sem perda de velocidade em {pares['corpus']} pares (linha, valor) do corpus "
+              f"e {pares['densas']} de linhas densas, nas variantes {', '.join(VARIANTES)}.")
+        sys.exit(0)
+
+    if args.importacao:
+        falhas = []
+        for modulo in MODULOS_NUCLEO:
+            medida = medir_importacao(modulo)
+            print(f"{modulo}: {medida['ms']} ms; mais caras: " + ", ".join(f"{nome} {ms} ms" for nome, ms in medida["mais_caras_ms"].items()))
+            if medida["ms"] > LIMITE_IMPORTACAO_MS: falhas.append(f"{modulo} leva {medida['ms']} ms (limite {LIMITE_IMPORTACAO_MS} ms)")
+            if medida["pesados_importados"]: falhas.append(f"{modulo} importa {', '.join(medida['pesados_importados'])}")
+        for falha in falhas: print(f"  - {falha}")
+        sys.exit(1 if falhas else 0)
+
+    resultado = executar_benchmark(args.variante, args.pasta, args.repeticoes, args.aquecimento)
+    imprimir_resumo(resultado)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo: json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        print(f"Resultado gravado em '{args.saida}'.")
+    else:
+        print(json.dumps(resultado, ensure_ascii=False, indent=2))
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo: base = json.load(arquivo)
+        regressoes = comparar_com_base(resultado, base, args.tolerancia)
+        if regressoes:
+            print(f"REGRESSÃO em relação a '{args.comparar}' (base {base.get('commit')}, tolerância {args.tolerancia:.0%}):")
+            for regressao in regressoes: print(f"  - {regressao}")
+            sys.exit(1)
+        print(f"Sem regressões em relação a '{args.comparar}' (tolerância {args.tolerancia:.0%}).")
@@ -0,0 +1,56 @@
+import os
+import json
+import sqlite3
+import hashlib
+
+# --- Cache persistente de resultados ---
+# Chave: hash do conteúdo do documento + hash do conjunto de regras ativo. Qualquer alteração nos
+# pesos, palavras-chave ou padrões muda o hash das regras e invalida automaticamente as entradas.
+DIRETORIO_CACHE_PADRAO = '.cache_extracao'
+NOME_BANCO_CACHE = 'resultados.sqlite'
+
+_conexoes = {}
+
+def calcular_hash_arquivo(caminho_arquivo, tamanho_bloco=1 << 20):
+    sha = hashlib.sha256()
+    with open(caminho_arquivo, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b""): sha.update(bloco)
+    return sha.hexdigest()
+
+def calcular_hash_conteudo(conteudo):
+    """Mesmo hash de `calcular_hash_arquivo`, para um arquivo já lido em memória."""
+    return hashlib.sha256(conteudo).hexdigest()
+
+def calcular_hash_regras(*componentes):
+    """Hash estável de qualquer combinação de dicts/listas/strings/números que definem as regras."""
+    serializado = json.dumps(componentes, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()
+
+def obter_conexao_cache(diretorio_cache):
+    """Uma conexão por processo (conexões SQLite não podem ser herdadas por fork)."""
+    chave = (os.getpid(), os.path.abspath(diretorio_cache))
+    if chave not in _conexoes:
+        os.makedirs(diretorio_cache, exist_ok=True)
+        conexao = sqlite3.connect(os.path.join(diretorio_cache, NOME_BANCO_CACHE), timeout=30)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute(
+            "CREATE TABLE IF NOT EXISTS resultados ("
+            "hash_documento TEXT NOT NULL, hash_regras TEXT NOT NULL, resultado TEXT NOT NULL, "
+            "PRIMARY KEY (hash_documento, hash_regras))"
+        )
+        conexao.commit()
+        _conexoes[chave] = conexao
+    return _conexoes[chave]
+
+def buscar_resultado(conexao, hash_documento, hash_regras):
+    linha = conexao.execute(
+        "SELECT resultado FROM resultados WHERE hash_documento = ? AND hash_regras = ?", (hash_documento, hash_regras)
+    ).fetchone()
+    return json.loads(linha[0]) if linha else None
+
+def gravar_resultado(conexao, hash_documento, hash_regras, resultado):
+    conexao.execute(
+        "INSERT OR REPLACE INTO resultados (hash_documento, hash_regras, resultado) VALUES (?, ?, ?)",
+        (hash_documento, hash_regras, json.dumps(resultado, ensure_ascii=False)),
+    )
+    conexao.commit()
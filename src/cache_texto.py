@@ -0,0 +1,68 @@
+import os
+import struct
+from array import array
+from functools import lru_cache
+
+# --- Cache persistente do texto extraído ---
+# Guarda, por documento, o que a leitura do PDF produz: os blocos de texto em ordem de leitura, o
+# índice do primeiro bloco de cada página, o texto da primeira página (metadados) e o nº de páginas.
+# Com ele (--from-text-cache), mudanças nos pesos e palavras-chave são reavaliadas sobre o corpus
+# inteiro sem abrir nenhum PDF de novo. Chave: hash do conteúdo do documento + versão do PyMuPDF +
+# VERSAO_FORMATO_TEXTO (aumente-a ao mudar a forma como os blocos são extraídos ou ordenados).
+# Formato: um arquivo binário por documento com cabeçalho, limites de página e deslocamentos (uint32)
+# e o texto UTF-8 contíguo; a leitura decodifica apenas os blocos pedidos.
+SUBDIRETORIO_TEXTOS = 'textos'
+VERSAO_FORMATO_TEXTO = 1
+ASSINATURA = b'TXC1'
+CABECALHO = struct.Struct('<4sIIi')  # assinatura, nº de blocos, nº de limites de página, páginas (-1 se não se aplica)
+
+@lru_cache(maxsize=None)
+def versao_extracao():
+    import fitz
+    return f"pymupdf{fitz.VersionBind}-f{VERSAO_FORMATO_TEXTO}"
+
+def caminho_texto(diretorio_cache, hash_documento):
+    return os.path.join(diretorio_cache, SUBDIRETORIO_TEXTOS, f"{hash_documento}-{versao_extracao()}.bin")
+
+class TextoDocumento:
+    """Texto extraído de um documento, lido de `caminho_texto`. Os blocos são decodificados sob demanda."""
+    def __init__(self, dados):
+        assinatura, n_blocos, n_limites, paginas = CABECALHO.unpack_from(dados)
+        if assinatura != ASSINATURA: raise ValueError("arquivo de texto em cache inválido")
+        inteiros = array('I'); inteiros.frombytes(dados[CABECALHO.size:CABECALHO.size + 4 * (n_limites + n_blocos + 2)])
+        self.limites_paginas = inteiros[:n_limites].tolist()
+        self.paginas = paginas if paginas >= 0 else None
+        self._deslocamentos, self._texto = inteiros[n_limites:], memoryview(dados)[CABECALHO.size + 4 * len(inteiros):]
+        self.texto_primeira_pagina = self._decodificar(0)
+
+    def __len__(self):
+        return len(self._deslocamentos) - 2
+
+    def _decodificar(self, indice):
+        return str(self._texto[self._deslocamentos[indice]:self._deslocamentos[indice + 1]], "utf-8", "surrogatepass")
+
+    def blocos(self, inicio=0, fim=None):
+        """Blocos [inicio:fim] (mesma semântica de fatia de lista)."""
+        return [self._decodificar(indice + 1) for indice in range(*slice(inicio, fim).indices(len(self)))]
+
+def ler_texto(diretorio_cache, hash_documento):
+    """TextoDocumento do documento, ou None se ainda não estiver em cache."""
+    try:
+        with open(caminho_texto(diretorio_cache, hash_documento), "rb") as arquivo: return TextoDocumento(arquivo.read())
+    except FileNotFoundError: return None
+
+def gravar_texto(diretorio_cache, hash_documento, blocos, limites_paginas, texto_primeira_pagina, paginas):
+    """Grava o texto de um documento (de forma atômica: workers podem gravar o mesmo documento ao mesmo tempo)."""
+    codificados = [texto.encode("utf-8", "surrogatepass") for texto in [texto_primeira_pagina, *blocos]]
+    deslocamentos, total = array('I', [0]), 0
+    for texto in codificados:
+        total += len(texto); deslocamentos.append(total)
+    caminho = caminho_texto(diretorio_cache, hash_documento)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(CABECALHO.pack(ASSINATURA, len(blocos), len(limites_paginas), -1 if paginas is None else paginas))
+        arquivo.write(array('I', limites_paginas).tobytes())
+        arquivo.write(deslocamentos.tobytes())
+        arquivo.write(b"".join(codificados))
+    os.replace(temporario, caminho)
@@ -0,0 +1,69 @@
+import os
+import json
+import time
+
+# --- Checkpoint de execuções longas ---
+# Journal JSONL: a primeira linha identifica a execução (pasta raiz, regras/modelos) e cada linha
+# seguinte registra uma subpasta concluída com o seu resultado e a assinatura dos seus arquivos (a
+# mesma do manifesto incremental). O arquivo é descarregado a cada linha e sincronizado em disco
+# periodicamente; com `retomar=True`, as subpastas já registradas cujos arquivos não mudaram são
+# reaproveitadas em vez de reprocessadas. Depois que a saída é gravada com sucesso, o journal é
+# removido (`descartar_checkpoint`): um --resume posterior recomeça do zero.
+INTERVALO_SYNC_REGISTROS = 20
+INTERVALO_SYNC_SEGUNDOS = 30
+
+class JournalCheckpoint:
+    def __init__(self, caminho, identificacao, retomar=False):
+        self.caminho, self.identificacao = caminho, identificacao
+        self.assinaturas = {}
+        self.concluidos = self._carregar() if retomar else {}
+        if retomar and self.concluidos: print(f"Retomando execução: {len(self.concluidos)} subpastas já concluídas em '{caminho}'")
+        self.arquivo = open(caminho, "a" if self.concluidos else "w", encoding="utf-8")
+        if not self.concluidos: self._escrever({"identificacao": identificacao})
+        self.pendentes_sync, self.ultimo_sync = 0, time.time()
+
+    def _carregar(self):
+        if not os.path.exists(self.caminho): return {}
+        concluidos, tamanho_valido = {}, 0
+        with open(self.caminho, "rb") as arquivo:
+            for numero_linha, linha in enumerate(arquivo):
+                if not linha.endswith(b"\n"): break  # última linha truncada por uma interrupção
+                try: registro = json.loads(linha)
+                except json.JSONDecodeError: break
+                if numero_linha == 0 and registro.get("identificacao") != self.identificacao:
+                    print(f"  -> Checkpoint '{self.caminho}' é de outra execução (pasta ou regras diferentes); recomeçando do zero.")
+                    return {}
+                if numero_linha > 0:
+                    concluidos[registro["subpasta"]] = registro["resultado"]
+                    self.assinaturas[registro["subpasta"]] = registro.get("assinatura")
+                tamanho_valido += len(linha)
+        # descarta o trecho truncado para que os novos registros comecem numa linha íntegra
+        with open(self.caminho, "r+b") as arquivo: arquivo.truncate(tamanho_valido)
+        return concluidos
+
+    def _escrever(self, registro):
+        self.arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self.arquivo.flush()
+
+    def reaproveitaveis(self, assinaturas):
+        """Resultados registrados das subpastas de `assinaturas` (nome -> assinatura atual) cujos arquivos não mudaram."""
+        validos = {nome: resultado for nome, resultado in self.concluidos.items() if nome in assinaturas and self.assinaturas.get(nome) == assinaturas[nome]}
+        alterados = sum(1 for nome in self.concluidos if nome in assinaturas and nome not in validos)
+        if alterados: print(f"  -> {alterados} subpastas do checkpoint foram alteradas desde o registro e serão reprocessadas.")
+        return validos
+
+    def registrar(self, nome_subpasta, resultado, assinatura=None):
+        self._escrever({"subpasta": nome_subpasta, "assinatura": assinatura, "resultado": resultado})
+        self.pendentes_sync += 1
+        if self.pendentes_sync >= INTERVALO_SYNC_REGISTROS or time.time() - self.ultimo_sync >= INTERVALO_SYNC_SEGUNDOS:
+            os.fsync(self.arquivo.fileno())
+            self.pendentes_sync, self.ultimo_sync = 0, time.time()
+
+    def fechar(self):
+        if self.arquivo.closed: return
+        os.fsync(self.arquivo.fileno())
+        self.arquivo.close()
+
+def descartar_checkpoint(caminho):
+    """Remove o journal depois que a saída da execução foi gravada com sucesso."""
+    if os.path.exists(caminho): os.remove(caminho)
@@ -0,0 +1,189 @@
+import io
+import os
+import re
+import json
+import time
+import argparse
+import importlib
+import contextlib
+from collections import Counter, defaultdict
+
+# --- Gabarito e comparação de variantes ---
+# O gabarito (`arquivos_teste/gabarito.json`) guarda, por subpasta, o valor esperado, a categoria do
+# critério, o nº do processo e o nº do acórdão. Esta ferramenta roda qualquer variante do extrator
+# sobre o corpus e mostra, lado a lado, acurácia por campo, acertos e confusão por categoria e tempo
+# de execução, para que toda otimização seja conferida também quanto ao resultado.
+# Entradas com "revisado": false foram geradas a partir de uma variante e ainda não conferidas à mão;
+# --gerar-gabarito as atualiza e preserva as revisadas. Havendo entradas revisadas, só elas entram na
+# avaliação; sem nenhuma, os percentuais medem apenas a concordância com a variante que gerou o
+# gabarito (não acurácia) e são rotulados assim.
+PASTA_CORPUS_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'arquivos_teste')
+CAMINHO_GABARITO_PADRAO = os.path.join(PASTA_CORPUS_PADRAO, 'gabarito.json')
+VARIANTES = {"noAI": "extractor_noAI", "color": "extractor_noAI_color", "llm": "extractor_IA"}
+CAMPOS = ["valor", "categoria", "numero_processo", "numero_acordao"]
+PREFIXO_HIERARQUIA = "etapa 2 - hierarquia: "
+RE_VALOR_RESPOSTA = re.compile(r'R\$\s*[\d\.,]+(?:\s*(?:mil|milh[oõ]es|bilh[oõ]es))?', re.IGNORECASE)
+TOLERANCIA_VALOR = 0.005
+
+def categoria_do_criterio(criterio, status_admissibilidade=None):
+    """'objeto_principal' para 'etapa 2 - hierarquia: objeto_principal [arq.pdf]'; 'arquivado' para inadmissíveis; senão o próprio critério."""
+    if status_admissibilidade == "Sim" or criterio == "Sim": return "arquivado"
+    if criterio and criterio.startswith(PREFIXO_HIERARQUIA): return criterio[len(PREFIXO_HIERARQUIA):].split(" [")[0]
+    return criterio or "indeterminado"
+
+def valor_numerico(texto):
+    from valores_monetarios import converter_valor_para_numero_refinado
+    if not texto: return None
+    match = RE_VALOR_RESPOSTA.search(texto)
+    if not match: return None
+    valor, erro = converter_valor_para_numero_refinado(match.group(0))
+    return valor if erro is None else None
+
+def rodar_variante_heuristica(modulo, pasta_corpus):
+    extrator = importlib.import_module(modulo)
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultados = extrator.processar_documentos(pasta_corpus)
+    previsoes = {}
+    for nome, dados in resultados.items():
+        metadados, valores = dados["metadados"], dados["valores_extraidos"]
+        previsoes[nome] = {
+            "valor": valores[0] if valores else None,
+            "categoria": categoria_do_criterio(dados["criterio_usado"], metadados.get("status_admissibilidade")),
+            "numero_processo": metadados.get("numero_processo_pdf"), "numero_acordao": metadados.get("numero_acordao"),
+        }
+    return previsoes
+
+def rodar_variante_llm(pasta_corpus, modo_filtro="nenhum"):
+    """Caminho com LLM usando o modelo substituto (sem carregar LLMs). Sem metadados; a categoria é o caminho de decisão."""
+    extrator = importlib.import_module("extractor_IA")
+    from servidor_modelos import criar_modelos
+    extrator.PASTA_RAIZ_PROCESSOS, extrator.LLM_MODELOS = pasta_corpus, criar_modelos(stub=True)[:1]
+    nome_modelo = extrator.LLM_MODELOS[0]["nome"]
+    with contextlib.redirect_stdout(io.StringIO()):
+        linhas = extrator.executar_extracao_com_llm(modo_filtro=modo_filtro, serial=True)
+    previsoes = {}
+    for linha in linhas:
+        resposta = linha.get(f"Resposta Interpretativa {nome_modelo}")
+        previsoes[linha["Nome Pasta Original"]] = {
+            "valor": resposta if resposta is None or RE_VALOR_RESPOSTA.search(str(resposta)) else None,
+            "categoria": linha.get(f"Decisão {nome_modelo}", "arquivado/sem documento"),
+            "numero_processo": None, "numero_acordao": None,
+        }
+    return previsoes
+
+def rodar_variante(variante, pasta_corpus):
+    """Retorna (previsões por subpasta, segundos)."""
+    inicio = time.perf_counter()
+    previsoes = rodar_variante_llm(pasta_corpus) if variante == "llm" else rodar_variante_heuristica(VARIANTES[variante], pasta_corpus)
+    return previsoes, time.perf_counter() - inicio
+
+def campo_correto(campo, esperado, previsto):
+    if campo == "valor":
+        valor_esperado, valor_previsto = valor_numerico(esperado), valor_numerico(previsto)
+        if valor_esperado is None or valor_previsto is None: return valor_esperado is None and valor_previsto is None
+        return abs(valor_esperado - valor_previsto) <= TOLERANCIA_VALOR
+    return esperado == previsto
+
+def avaliar(previsoes, gabarito, variante):
+    """Acurácia por campo (None quando a variante não produz o campo), acertos de valor e confusão por categoria esperada."""
+    acertos, por_categoria, confusao = Counter(), defaultdict(Counter), defaultdict(Counter)
+    for nome, esperado in gabarito.items():
+        previsto = previsoes.get(nome, {})
+        for campo in CAMPOS:
+            if campo_correto(campo, esperado[campo], previsto.get(campo)): acertos[campo] += 1
+        categoria = esperado["categoria"]
+        por_categoria[categoria]["total"] += 1
+        por_categoria[categoria]["valor_correto"] += campo_correto("valor", esperado["valor"], previsto.get("valor"))
+        confusao[categoria][previsto.get("categoria", "ausente")] += 1
+    total = len(gabarito)
+    sem_campo = {"categoria", "numero_processo", "numero_acordao"} if variante == "llm" else set()
+    return {
+        "acuracia": {campo: (None if campo in sem_campo else round(acertos[campo] / total, 4)) for campo in CAMPOS},
+        "por_categoria": {categoria: dict(contagem) for categoria, contagem in sorted(por_categoria.items())},
+        "confusao": {categoria: dict(contagem) for categoria, contagem in sorted(confusao.items())},
+    }
+
+def carregar_gabarito(caminho_gabarito):
+    with open(caminho_gabarito, encoding="utf-8") as arquivo: return json.load(arquivo)["subpastas"]
+
+def selecionar_revisadas(gabarito):
+    """(entradas avaliadas, revisadas?): só as revisadas quando houver alguma; senão todas, e o resultado é só concordância."""
+    revisadas = {nome: entrada for nome, entrada in gabarito.items() if entrada.get("revisado")}
+    return (revisadas, True) if revisadas else (gabarito, False)
+
+def avisar_nao_revisadas(gabarito):
+    nao_revisadas = sum(1 for entrada in gabarito.values() if not entrada.get("revisado"))
+    if nao_revisadas == len(gabarito):
+        print(f"AVISO: nenhuma das {len(gabarito)} entradas do gabarito foi revisada. Elas foram geradas por uma variante do extrator, "
+              "então os percentuais medem a concordância com essa variante, não a acurácia.\n")
+    elif nao_revisadas:
+        print(f"AVISO: {nao_revisadas} de {len(gabarito)} entradas do gabarito não foram revisadas e ficam fora da avaliação.\n")
+
+def gerar_gabarito(caminho_gabarito, pasta_corpus, variante="noAI"):
+    """(Re)gera as entradas não revisadas a partir de `variante`; entradas com "revisado": true são mantidas."""
+    anteriores = carregar_gabarito(caminho_gabarito) if os.path.exists(caminho_gabarito) else {}
+    previsoes, _ = rodar_variante(variante, pasta_corpus)
+    subpastas = {}
+    for nome in sorted(previsoes):
+        if anteriores.get(nome, {}).get("revisado"): subpastas[nome] = anteriores[nome]
+        else: subpastas[nome] = dict(previsoes[nome], revisado=False)
+    gabarito = {
+        "descricao": "Resultados esperados por subpasta de arquivos_teste. Só as entradas com revisado=true foram conferidas "
+                     f"manualmente nos documentos; as demais foram geradas por '{VARIANTES[variante]}' e não servem de gabarito.",
+        "subpastas": subpastas,
+    }
+    with open(caminho_gabarito, "w", encoding="utf-8") as arquivo:
+        json.dump(gabarito, arquivo, ensure_ascii=False, indent=2)
+        arquivo.write("\n")
+    revisadas = sum(1 for entrada in subpastas.values() if entrada["revisado"])
+    print(f"Gabarito '{caminho_gabarito}' gravado: {len(subpastas)} subpastas ({revisadas} revisadas).")
+
+def formatar_percentual(valor):
+    return "   n/a" if valor is None else f"{100 * valor:5.1f}%"
+
+def imprimir_comparacao(relatorio):
+    variantes = list(relatorio)
+    revisado = all(relatorio[v]["gabarito_revisado"] for v in variantes)
+    medida = "acurácia" if revisado else "concordância"
+    if not revisado: print("Percentuais = concordância com gabarito não revisado (não é acurácia).")
+    print(f"{'':30}" + "".join(f"{variante:>12}" for variante in variantes))
+    print(f"{'tempo (s)':30}" + "".join(f"{relatorio[v]['tempo_s']:>12.2f}" for v in variantes))
+    for campo in CAMPOS:
+        print(f"{medida + ' ' + campo:30}" + "".join(f"{formatar_percentual(relatorio[v]['acuracia'][campo]):>12}" for v in variantes))
+    print("\nValor correto por categoria esperada:")
+    categorias = sorted({c for v in variantes for c in relatorio[v]["por_categoria"]})
+    for categoria in categorias:
+        celulas = []
+        for v in variantes:
+            contagem = relatorio[v]["por_categoria"].get(categoria, {})
+            celulas.append(f"{contagem.get('valor_correto', 0)}/{contagem.get('total', 0)}")
+        print(f"  {categoria[:30]:32}" + "".join(f"{celula:>12}" for celula in celulas))
+    for v in variantes:
+        print(f"\nConfusão {v} (categoria esperada -> obtida):")
+        for esperada, obtidas in relatorio[v]["confusao"].items():
+            print(f"  {esperada[:30]:32}" + ", ".join(f"{obtida}: {n}" for obtida, n in sorted(obtidas.items(), key=lambda x: -x[1])))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compara variantes do extrator contra o gabarito de arquivos_teste.")
+    parser.add_argument("--variantes", nargs="+", choices=list(VARIANTES), default=list(VARIANTES), help="variantes comparadas (padrão: todas; 'llm' usa o modelo substituto)")
+    parser.add_argument("--pasta", default=PASTA_CORPUS_PADRAO, help="pasta raiz do corpus (padrão: arquivos_teste)")
+    parser.add_argument("--gabarito", default=CAMINHO_GABARITO_PADRAO, help="arquivo do gabarito (padrão: arquivos_teste/gabarito.json)")
+    parser.add_argument("--gerar-gabarito", choices=["noAI", "color"], metavar="VARIANTE", help="(re)gera as entradas não revisadas do gabarito a partir desta variante e sai")
+    parser.add_argument("--saida", help="grava o relatório em JSON neste arquivo")
+    args = parser.parse_args()
+
+    if args.gerar_gabarito:
+        gerar_gabarito(args.gabarito, args.pasta, args.gerar_gabarito)
+        raise SystemExit
+
+    gabarito = carregar_gabarito(args.gabarito)
+    avisar_nao_revisadas(gabarito)
+    avaliadas, revisado = selecionar_revisadas(gabarito)
+    relatorio = {}
+    for variante in args.variantes:
+        previsoes, segundos = rodar_variante(variante, args.pasta)
+        relatorio[variante] = dict(avaliar(previsoes, avaliadas, variante), tempo_s=round(segundos, 3), gabarito_revisado=revisado, entradas_avaliadas=len(avaliadas))
+    imprimir_comparacao(relatorio)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo: json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nRelatório gravado em '{args.saida}'.")
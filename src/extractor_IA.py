@@ -1,159 +1,458 @@
 import os
 import re
-import sys
 import time
-import pandas as pd
-from collections import defaultdict
-from docx import Document
-from llama_cpp import Llama
+import argparse
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
 
 from extractor_noAI import (
-    analisar_conteudo_para_valores,
-    obter_texto_documento, verificar_admissibilidade_e_arquivamento,
-    extrair_metadados_pdf, print_progress_bar, converter_valor_para_numero_refinado
+    coletar_candidatos, melhores_por_categoria, escolher_por_hierarquia,
+    analisar_contexto_linha, pontuar_valor, RE_SECOES_DECISAO,
+    carregar_documento, verificar_admissibilidade_e_arquivamento, registrar_tempo
 )
+from valores_monetarios import converter_valor_para_numero_refinado
+from checkpoint_execucao import JournalCheckpoint, descartar_checkpoint
+from manifesto_incremental import assinatura_subpasta
+from servidor_modelos import criar_modelos, interpretar_endereco
+from instrumentacao import EscritorTraces, ModeloRastreado, perfilar, tempos_em_ms
+from progresso import RelatorioProgresso
+
+# pandas, asyncio e os modelos (llama_cpp) só são importados quando a etapa que os usa roda (ver extractor_noAI.py).
 
 PASTA_RAIZ_PROCESSOS = 'arquivos_teste_llms'
 CHUNK_SIZE = 500
-MAX_TOKENS_RESUMO = 3500  # número máximo de tokens aproximado para resumo fallback
-
-# --- Inicialização dos Modelos LLM Locais ---
-LLM_MODELOS = [
-    {
-        "nome": "Llama3",
-        "modelo": Llama(model_path="./models/Meta-Llama-3-8B-Instruct.Q5_K_M.gguf", n_ctx=4096)
-    },
-    {
-        "nome": "Phi3",
-        "modelo": Llama(model_path="./models/Phi-3-mini-4k-instruct-Q4_K_M.gguf", n_ctx=4096)
-    }
-]
+# --- Contexto do resumo (fallback) ---
+# O texto enviado ao modelo é montado com os parágrafos de maior densidade de valores/palavras-chave
+# (score heurístico por token), contados com o tokenizador do próprio modelo, até caber exatamente
+# no orçamento: o menor entre MAX_TOKENS_RESUMO e o que sobra de n_ctx depois das instruções e da resposta.
+MAX_TOKENS_RESUMO = 1500  # número máximo de tokens do texto do resumo fallback
+MAX_TOKENS_RESPOSTA_RESUMO = 200
+N_CTX_PADRAO = 4096
 
-def classificar_valor_com_llm(paragrafo, valor, modelo):
-    prompt = (
-        f"A seguir está um trecho de um documento fiscalizatório que menciona o valor monetário '{valor}':\n"
-        f"\n{paragrafo}\n"
-        "Este valor corresponde ao recurso fiscalizado principal deste processo, como um contrato, licitação ou sanção relevante?\n"
-        "Responda apenas com 'SIM' ou 'NÃO'."
-    )
+# --- Pré-filtro heurístico ---
+# "nenhum": todos os candidatos vão para o LLM (comportamento original).
+# "topk": só os TOP_K_LLM candidatos de maior score heurístico vão para o LLM.
+# "auto": como "topk", mas o LLM nem é consultado quando o vencedor da hierarquia heurística é
+#         'objeto_principal' com score >= LIMIAR_DECISAO_HEURISTICA.
+MODOS_FILTRO_LLM = ("nenhum", "topk", "auto")
+MODO_FILTRO_PADRAO = "auto"
+TOP_K_LLM = 8
+LIMIAR_DECISAO_HEURISTICA = 1.5
+
+# Documentos já lidos que podem esperar na fila de cada modelo no pipeline assíncrono
+PROFUNDIDADE_FILA_LLM = 4
+
+# --- Modelos LLM Locais ---
+# Carregados só na primeira chamada (ver servidor_modelos.py); em __main__, --servidor e --stub
+# trocam esta lista por clientes do servidor local ou pelo modelo substituto.
+LLM_MODELOS = criar_modelos()
+
+# --- Classificação de candidatos em lote ---
+# Em vez de uma chamada por valor, os candidatos vão numerados num único prompt (até TAMANHO_LOTE_LLM
+# por chamada) e o modelo devolve os números dos que correspondem ao recurso fiscalizado. As
+# instruções ficam no início do prompt e são idênticas em todas as chamadas: o llama.cpp reaproveita
+# o cache KV do maior prefixo em comum com a chamada anterior do mesmo modelo, de modo que só a lista
+# de candidatos é avaliada a cada vez. Os vereditos ficam num memo LRU limitado, por (modelo, trecho
+# enviado, valor): o mesmo trecho se repete entre os documentos de um processo.
+TAMANHO_LOTE_LLM = 16
+JANELA_CONTEXTO_LLM = 400  # caracteres do parágrafo em volta do valor enviados ao modelo
+TAMANHO_MEMO_VEREDITOS = 4096
+PREFIXO_PROMPT_LOTE = (
+    "A seguir estão trechos numerados de um documento fiscalizatório, cada um mencionando um valor monetário.\n"
+    "Indique quais valores correspondem ao recurso fiscalizado principal deste processo, como um contrato, licitação ou sanção relevante.\n"
+    "Responda apenas com os números dos trechos, do mais para o menos relevante, separados por vírgula, ou 'NENHUM'.\n"
+)
+RE_VALOR_LLM = re.compile(r'R\$\s*[\d\.,]+')
+# resposta esperada ao prompt em lote, na primeira linha: 'NENHUM' ou os números dos trechos separados por vírgula ("2, [5]")
+RE_RESPOSTA_LOTE = re.compile(r'(?:NENHUM|\[?\d+\]?(?:\s*,\s*\[?\d+\]?)*)\.?', re.IGNORECASE)
+
+_vereditos_llm, _trava_vereditos = OrderedDict(), threading.Lock()  # (nome do modelo, trecho, valor) -> True/False
+
+def _buscar_veredito(chave):
+    with _trava_vereditos:
+        if chave not in _vereditos_llm: return None
+        _vereditos_llm.move_to_end(chave)
+        return _vereditos_llm[chave]
+
+def _memorizar_veredito(chave, veredito):
+    with _trava_vereditos:
+        _vereditos_llm[chave] = veredito
+        _vereditos_llm.move_to_end(chave)
+        if len(_vereditos_llm) > TAMANHO_MEMO_VEREDITOS: _vereditos_llm.popitem(last=False)
+
+def recortar_contexto(paragrafo, valor):
+    """Trecho de até JANELA_CONTEXTO_LLM caracteres do parágrafo centrado na primeira ocorrência do valor."""
+    if len(paragrafo) <= JANELA_CONTEXTO_LLM: return paragrafo
+    inicio = max(0, paragrafo.find(valor) - JANELA_CONTEXTO_LLM // 2)
+    return "..." + paragrafo[inicio:inicio + JANELA_CONTEXTO_LLM] + "..."
+
+def classificar_lote_com_llm(lote, modelo):
+    """
+    Classifica numa única chamada uma lista de (valor, trecho já recortado). Retorna os índices aprovados
+    pelo modelo. Levanta ValueError se a resposta não seguir o formato pedido ou citar um trecho que não
+    existe: o lote fica sem veredito em vez de aprovar números soltos da resposta.
+    """
+    itens = "".join(f"\n[{i}] Valor: {valor}\nTrecho: {trecho}\n" for i, (valor, trecho) in enumerate(lote, 1))
     resposta = modelo(
-        prompt=prompt,
-        max_tokens=10,
+        prompt=PREFIXO_PROMPT_LOTE + itens + "\nResposta:",
+        max_tokens=4 * len(lote) + 8,
         temperature=0.0
     )
-    return resposta["choices"][0]["text"].strip().upper().startswith("SIM")
+    linhas = resposta["choices"][0]["text"].strip().splitlines()
+    primeira_linha = linhas[0].strip() if linhas else ""
+    if not RE_RESPOSTA_LOTE.fullmatch(primeira_linha): raise ValueError(f"resposta fora do formato: {primeira_linha[:80]!r}")
+    numeros = [int(n) for n in re.findall(r'\d+', primeira_linha)]
+    if any(not 1 <= n <= len(lote) for n in numeros): raise ValueError(f"trecho inexistente na resposta: {primeira_linha[:80]!r}")
+    return {n - 1 for n in numeros}
 
-def selecionar_valor_via_llm(paragrafos, modelo):
+def classificar_candidatos_com_llm(pares, modelo, nome_modelo):
+    """Vereditos (True/False) para cada (valor, parágrafo) de `pares`, consultando o modelo só pelos ainda não memorizados."""
+    chaves = [(nome_modelo, recortar_contexto(paragrafo, valor), valor) for valor, paragrafo in pares]
+    vereditos = {chave: _buscar_veredito(chave) for chave in chaves}
+    pendentes = [chave for chave, veredito in vereditos.items() if veredito is None]
+    for inicio in range(0, len(pendentes), TAMANHO_LOTE_LLM):
+        lote = pendentes[inicio:inicio + TAMANHO_LOTE_LLM]
+        try:
+            aprovados = classificar_lote_com_llm([(valor, trecho) for _, trecho, valor in lote], modelo)
+        except Exception:
+            continue
+        for i, chave in enumerate(lote):
+            vereditos[chave] = i in aprovados
+            _memorizar_veredito(chave, vereditos[chave])
+    return [bool(vereditos[chave]) for chave in chaves]
+
+def coletar_candidatos_llm(paragrafos, top_k=None):
+    """
+    Valores de todos os parágrafos como (valor, parágrafo, valor numérico). Com `top_k`, ficam só os
+    `top_k` de maior score do extrator heurístico, na ordem original do documento.
+    """
     candidatos = []
     for paragrafo in paragrafos:
-        matches = re.findall(r'R\$\s*[\d\.,]+', paragrafo)
+        matches = RE_VALOR_LLM.findall(paragrafo)
+        contexto_linha = None
         for match in matches:
             valor_num, erro = converter_valor_para_numero_refinado(match)
             if erro is None and valor_num > 0:
-                candidatos.append((match, paragrafo.strip(), valor_num))
+                if contexto_linha is None: contexto_linha = analisar_contexto_linha(paragrafo.strip(), RE_SECOES_DECISAO.search(paragrafo) is not None)
+                score, _ = pontuar_valor(valor_num, contexto_linha)
+                candidatos.append((match, paragrafo.strip(), valor_num, score))
 
-    melhores = []
-    for valor_str, contexto, valor_num in candidatos:
-        try:
-            if classificar_valor_com_llm(contexto, valor_str, modelo):
-                melhores.append((valor_str, valor_num, contexto))
-        except Exception:
-            continue
+    if top_k is not None and len(candidatos) > top_k:
+        mantidos = set(sorted(range(len(candidatos)), key=lambda i: -candidatos[i][3])[:top_k])
+        candidatos = [c for i, c in enumerate(candidatos) if i in mantidos]
+    return [c[:3] for c in candidatos]
+
+def selecionar_valor_via_llm(paragrafos, modelo, nome_modelo=None, candidatos=None):
+    if candidatos is None: candidatos = coletar_candidatos_llm(paragrafos)
+
+    vereditos = classificar_candidatos_com_llm([(valor_str, contexto) for valor_str, contexto, _ in candidatos], modelo, nome_modelo or id(modelo))
+    melhores = [(valor_str, valor_num, contexto) for (valor_str, contexto, valor_num), aprovado in zip(candidatos, vereditos) if aprovado]
 
     if melhores:
         melhor_valor = max(melhores, key=lambda x: x[1])
         return melhor_valor[0], melhor_valor[2]
     return None, None
 
+def relevancia_paragrafo(paragrafo):
+    """Soma dos scores heurísticos dos valores do parágrafo (ou dos pesos das palavras-chave, se não houver valores)."""
+    contexto_linha = analisar_contexto_linha(paragrafo, RE_SECOES_DECISAO.search(paragrafo) is not None)
+    if contexto_linha["negativo"]: return 0.0
+    scores = []
+    for match in RE_VALOR_LLM.findall(paragrafo):
+        valor_num, erro = converter_valor_para_numero_refinado(match)
+        if erro is None and valor_num > 0: scores.append(pontuar_valor(valor_num, contexto_linha)[0])
+    return sum(scores) if scores else sum(contexto_linha["pesos"])
+
+def montar_contexto_resumo(paragrafos, modelo, orcamento):
+    """
+    Seleciona parágrafos por relevância por token até `orcamento` tokens e os devolve na ordem do
+    documento. Sem nenhum parágrafo relevante, usa o início do documento.
+    """
+    paragrafos = [p.strip() for p in paragrafos if p.strip()]
+    if not paragrafos or orcamento <= 0: return ""
+    tokens = modelo.contar_tokens(paragrafos)
+    relevancias = [relevancia_paragrafo(p) for p in paragrafos]
+    relevante = any(relevancias)
+    if relevante: ordem = sorted(range(len(paragrafos)), key=lambda i: -relevancias[i] / max(1, tokens[i]))
+    else: ordem = range(len(paragrafos))
+
+    escolhidos, usados = [], 0
+    for i in ordem:
+        if relevante and not relevancias[i]: continue
+        if usados + tokens[i] + 1 > orcamento:
+            if relevante: continue  # um parágrafo relevante menor ainda pode caber
+            break  # sem relevância, só o trecho inicial contínuo do documento
+        escolhidos.append(i); usados += tokens[i] + 1  # +1 pela quebra de linha
+    # a contagem por parágrafo é uma aproximação da contagem do texto unido; confere e corta o menos relevante
+    while escolhidos:
+        texto = "\n".join(paragrafos[i] for i in sorted(escolhidos))
+        if modelo.contar_tokens([texto])[0] <= orcamento: return texto
+        escolhidos.pop()
+    return ""
+
 def fallback_resumo_llm(paragrafos, modelo):
     prompt = (
         "A seguir está o conteúdo parcial de um documento fiscalizatório.\n"
         "Com base nele, identifique o valor monetário principal relacionado ao recurso fiscalizado.\n"
         "Seja direto na resposta.\nTexto:\n"
     )
-    palavras = []
-    for p in paragrafos:
-        palavras.extend(p.split())
-        if len(palavras) > MAX_TOKENS_RESUMO:
-            break
-    texto_limitado = " ".join(palavras[:MAX_TOKENS_RESUMO])
+    disponivel = getattr(modelo, "n_ctx", N_CTX_PADRAO) - modelo.contar_tokens([prompt])[0] - MAX_TOKENS_RESPOSTA_RESUMO - 8
+    texto_limitado = montar_contexto_resumo(paragrafos, modelo, min(MAX_TOKENS_RESUMO, disponivel))
     resposta = modelo(
         prompt=prompt + texto_limitado,
-        max_tokens=200,
+        max_tokens=MAX_TOKENS_RESPOSTA_RESUMO,
         temperature=0.3
     )
     return resposta["choices"][0]["text"].strip()
 
-def executar_extracao_com_llm():
-    resultados_finais = []
-    subpastas = [d for d in os.listdir(PASTA_RAIZ_PROCESSOS) if os.path.isdir(os.path.join(PASTA_RAIZ_PROCESSOS, d))]
+def preparar_subpasta_llm(nome_subpasta, modo_filtro=MODO_FILTRO_PADRAO, top_k=TOP_K_LLM, rastrear=False):
+    """
+    Etapa sem modelo: lê o documento, verifica a admissibilidade e aplica o pré-filtro heurístico.
+    Retorna (linha de resultado, sufixo da barra de progresso, tarefa, trace); `tarefa` é None quando
+    a linha já está completa (sem documento, ilegível ou arquivado) e dispensa os modelos. Com
+    `rastrear`, `trace` traz tempos e contagens do documento (e recebe as chamadas de LLM em
+    `inferir_com_modelo`); senão é None.
+    """
+    tempos, inicio = ({} if rastrear else None), time.perf_counter()
+    trace = {"subpasta": nome_subpasta, "arquivo": None, "tempos_ms": {}, "llm": {}} if rastrear else None
+    def finalizar(linha_resultado, sufixo, tarefa=None, **contagens):
+        if trace is not None:
+            tempos["preparacao"] = time.perf_counter() - inicio
+            trace.update(contagens, tempos_ms=tempos_em_ms(tempos))
+        return linha_resultado, sufixo, tarefa, trace
 
-    print_progress_bar(0, len(subpastas), prefix='Progresso:', suffix='Completo', length=40)
-    for i, nome_subpasta in enumerate(subpastas):
-        caminho_subpasta = os.path.join(PASTA_RAIZ_PROCESSOS, nome_subpasta)
-        documento_path = None
-        for ext in ['.pdf', '.docx']:
-            for arq in sorted(os.listdir(caminho_subpasta)):
-                if arq.lower().endswith(ext) and not arq.startswith('~$'):
-                    documento_path = os.path.join(caminho_subpasta, arq)
-                    break
-            if documento_path: break
-
-        metadados = extrair_metadados_pdf(documento_path) if documento_path and documento_path.endswith('.pdf') else {}
-        metadados.update({"nome_pasta": nome_subpasta, "nome_arquivo": os.path.basename(documento_path) if documento_path else "N/A"})
-
-        if not documento_path:
-            resultados_finais.append({"Nome Pasta Original": nome_subpasta, "Valor Fiscalizado Algoritmo (R$)": None})
-            print_progress_bar(i + 1, len(subpastas), prefix='Progresso:', suffix='(Sem Doc)', length=40)
-            continue
+    caminho_subpasta = os.path.join(PASTA_RAIZ_PROCESSOS, nome_subpasta)
+    documento_path = None
+    for ext in ['.pdf', '.docx']:
+        for arq in sorted(os.listdir(caminho_subpasta)):
+            if arq.lower().endswith(ext) and not arq.startswith('~$'):
+                documento_path = os.path.join(caminho_subpasta, arq)
+                break
+        if documento_path: break
 
-        paragrafos = obter_texto_documento(documento_path)
-        if not paragrafos:
-            resultados_finais.append({"Nome Pasta Original": nome_subpasta, "Valor Fiscalizado Algoritmo (R$)": None})
-            print_progress_bar(i + 1, len(subpastas), prefix='Progresso:', suffix='(Erro Leitura)', length=40)
-            continue
+    documento = carregar_documento(documento_path, tempos=tempos) if documento_path else None
+    metadados = dict(documento["metadados"]) if documento is not None else {}
+    metadados.update({"nome_pasta": nome_subpasta, "nome_arquivo": os.path.basename(documento_path) if documento_path else "N/A"})
+    if trace is not None: trace["arquivo"] = metadados["nome_arquivo"]
 
-        admissibilidade = verificar_admissibilidade_e_arquivamento(paragrafos)
-        if admissibilidade == "Sim":
-            resultados_finais.append({"Nome Pasta Original": nome_subpasta, "Valor Fiscalizado Algoritmo (R$)": None})
-            print_progress_bar(i + 1, len(subpastas), prefix='Progresso:', suffix='(Arquivado)', length=40)
-            continue
+    if not documento_path:
+        return finalizar({"Nome Pasta Original": nome_subpasta, "Valor Fiscalizado Algoritmo (R$)": None}, '(Sem Doc)')
+
+    paragrafos = documento["paragrafos"] if documento is not None else None
+    if not paragrafos:
+        return finalizar({"Nome Pasta Original": nome_subpasta, "Valor Fiscalizado Algoritmo (R$)": None}, '(Erro Leitura)')
+
+    contagens = {"paginas": documento["paginas"], "blocos": len(paragrafos)}
+    inicio_etapa = time.perf_counter()
+    admissibilidade = verificar_admissibilidade_e_arquivamento(paragrafos)
+    inicio_etapa = registrar_tempo(tempos, "admissibilidade", inicio_etapa)
+    if admissibilidade == "Sim":
+        return finalizar({"Nome Pasta Original": nome_subpasta, "Valor Fiscalizado Algoritmo (R$)": None}, '(Arquivado)', **contagens)
+
+    candidatos_heuristica = coletar_candidatos(paragrafos)
+    melhor_candidato, categoria = escolher_por_hierarquia(melhores_por_categoria(candidatos_heuristica))
+    valor_algo = melhor_candidato["valor_str"] if melhor_candidato else None
+
+    linha_resultado = {
+        "Nome Pasta Original": nome_subpasta,
+        "Valor Fiscalizado Algoritmo (R$)": valor_algo
+    }
+
+    heuristica_decide = modo_filtro == "auto" and categoria == 'objeto_principal' and melhor_candidato["score"] >= LIMIAR_DECISAO_HEURISTICA
+    tarefa = {
+        "paragrafos": paragrafos,
+        "candidatos": None if heuristica_decide else coletar_candidatos_llm(paragrafos, top_k if modo_filtro != "nenhum" else None),
+        "heuristica": (valor_algo, f"Heurística ({categoria}, score {melhor_candidato['score']:.2f})") if heuristica_decide else None
+    }
+    registrar_tempo(tempos, "pontuacao", inicio_etapa)
+    contagens.update(
+        candidatos={c: len(lista) for c, lista in candidatos_heuristica.items()},
+        candidatos_llm=len(tarefa["candidatos"] or []), decisao_heuristica=heuristica_decide
+    )
+    return finalizar(linha_resultado, f'({nome_subpasta})', tarefa, **contagens)
+
+def inferir_com_modelo(tarefa, modelo, trace=None):
+    """
+    Etapa de inferência de um modelo sobre uma tarefa de `preparar_subpasta_llm`. Retorna as colunas
+    desse modelo. Com `trace`, registra em trace["llm"][nome] o tempo total e cada chamada ao modelo.
+    """
+    nome = modelo["nome"]
+    modelo_llm = modelo_resumo = modelo["modelo"]
+    inicio = time.perf_counter()
+    if trace is not None:
+        chamadas = []
+        modelo_llm, modelo_resumo = ModeloRastreado(modelo_llm, chamadas, "lote"), ModeloRastreado(modelo_llm, chamadas, "resumo")
+    if tarefa["heuristica"]:
+        (valor_llm, contexto), decisao = tarefa["heuristica"], "heuristica"
+    else:
+        valor_llm, contexto = selecionar_valor_via_llm(tarefa["paragrafos"], modelo_llm, nome, tarefa["candidatos"])
+        decisao = "llm"
+    if valor_llm is None:
+        try:
+            valor_llm = fallback_resumo_llm(tarefa["paragrafos"], modelo_resumo)
+            contexto, decisao = "Resumo automatizado", "llm_resumo"
+        except Exception as e:
+            valor_llm = f"Erro: {e}"
+            contexto, decisao = "Erro no fallback", "erro"
+    if trace is not None: trace["llm"][nome] = {"ms": round((time.perf_counter() - inicio) * 1000, 3), "decisao": decisao, "chamadas": chamadas}
+    return {f"Resposta Interpretativa {nome}": valor_llm, f"Resumo {nome}": contexto, f"Decisão {nome}": decisao}
 
-        valor_extraido, _ = analisar_conteudo_para_valores(paragrafos)
-        valor_algo = valor_extraido[0] if valor_extraido else None
+def processar_subpasta_llm(nome_subpasta, modo_filtro=MODO_FILTRO_PADRAO, top_k=TOP_K_LLM, rastrear=False):
+    """
+    Processa uma subpasta pelo caminho com LLM, em série. Retorna (linha de resultado, sufixo da barra
+    de progresso, trace ou None). A coluna "Decisão <modelo>" registra quem decidiu o valor:
+    heurística, LLM ou resumo do LLM.
+    """
+    linha_resultado, sufixo, tarefa, trace = preparar_subpasta_llm(nome_subpasta, modo_filtro, top_k, rastrear)
+    if tarefa is not None:
+        for modelo in LLM_MODELOS: linha_resultado.update(inferir_com_modelo(tarefa, modelo, trace))
+    return linha_resultado, sufixo, trace
 
-        linha_resultado = {
-            "Nome Pasta Original": nome_subpasta,
-            "Valor Fiscalizado Algoritmo (R$)": valor_algo
+async def executar_pipeline_llm(subpastas, concluir, modo_filtro=MODO_FILTRO_PADRAO, top_k=TOP_K_LLM, rastrear=False):
+    """
+    Pipeline assíncrono: um produtor lê e prepara as subpastas à frente (numa thread) e entrega cada
+    tarefa à fila limitada de cada modelo; um consumidor por modelo roda a inferência na sua própria
+    thread, de modo que os modelos trabalham em paralelo e a leitura da subpasta N+1 se sobrepõe à
+    inferência da subpasta N. Filas cheias bloqueiam o produtor (no máximo PROFUNDIDADE_FILA_LLM
+    documentos esperando por modelo). `concluir(nome, linha, sufixo, trace)` é chamado na ordem de
+    `subpastas`, assim que cada linha fica completa. Retorna as estatísticas por etapa.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    loop = asyncio.get_running_loop()
+    filas = {modelo["nome"]: asyncio.Queue(maxsize=PROFUNDIDADE_FILA_LLM) for modelo in LLM_MODELOS}
+    estatisticas = {etapa: {"itens": 0, "ocupado": 0.0, "parado": 0.0} for etapa in ["leitura", *filas]}
+    prontos = [loop.create_future() for _ in subpastas]
+    parciais = {}
+
+    async def produtor():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            for indice, nome_subpasta in enumerate(subpastas):
+                inicio = time.perf_counter()
+                linha_resultado, sufixo, tarefa, trace = await loop.run_in_executor(executor, preparar_subpasta_llm, nome_subpasta, modo_filtro, top_k, rastrear)
+                estatisticas["leitura"]["itens"] += 1; estatisticas["leitura"]["ocupado"] += time.perf_counter() - inicio
+                if tarefa is None:
+                    prontos[indice].set_result((linha_resultado, sufixo, trace))
+                    continue
+                parciais[indice] = {}
+                inicio = time.perf_counter()
+                for fila in filas.values(): await fila.put((indice, linha_resultado, sufixo, tarefa, trace))
+                estatisticas["leitura"]["parado"] += time.perf_counter() - inicio
+        for fila in filas.values(): await fila.put(None)
+
+    async def consumidor(modelo):
+        nome = modelo["nome"]
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            while True:
+                inicio = time.perf_counter()
+                item = await filas[nome].get()
+                estatisticas[nome]["parado"] += time.perf_counter() - inicio
+                if item is None: return
+                indice, linha_resultado, sufixo, tarefa, trace = item
+                inicio = time.perf_counter()
+                parciais[indice][nome] = await loop.run_in_executor(executor, inferir_com_modelo, tarefa, modelo, trace)
+                estatisticas[nome]["itens"] += 1; estatisticas[nome]["ocupado"] += time.perf_counter() - inicio
+                if len(parciais[indice]) == len(filas):
+                    for m in LLM_MODELOS: linha_resultado.update(parciais[indice][m["nome"]])  # colunas sempre na ordem dos modelos
+                    del parciais[indice]
+                    prontos[indice].set_result((linha_resultado, sufixo, trace))
+
+    async def coletor():
+        for indice, nome_subpasta in enumerate(subpastas):
+            concluir(nome_subpasta, *await prontos[indice])
+
+    await asyncio.gather(produtor(), coletor(), *(consumidor(modelo) for modelo in LLM_MODELOS))
+    return estatisticas
+
+def resumir_estatisticas_pipeline(estatisticas):
+    partes = []
+    for etapa, e in estatisticas.items():
+        taxa = e["itens"] / e["ocupado"] if e["ocupado"] else 0.0
+        espera = "bloqueada pelas filas" if etapa == "leitura" else "ociosa"
+        partes.append(f"{etapa}: {e['itens']} docs, {e['ocupado']:.2f}s ocupada ({taxa:.2f} docs/s), {e['parado']:.2f}s {espera}")
+    return "Pipeline - " + "; ".join(partes)
+
+def categoria_da_linha(linha_resultado, sufixo):
+    """Para as contagens do progresso: o motivo das linhas sem modelo ou o caminho de decisão do primeiro modelo."""
+    sem_modelo = {'(Sem Doc)': "sem documento", '(Erro Leitura)': "erro leitura", '(Arquivado)': "arquivado"}
+    if sufixo in sem_modelo: return sem_modelo[sufixo]
+    return linha_resultado.get(f"Decisão {LLM_MODELOS[0]['nome']}") if LLM_MODELOS else None
+
+def executar_extracao_com_llm(caminho_checkpoint=None, retomar=False, modo_filtro=MODO_FILTRO_PADRAO, top_k=TOP_K_LLM, serial=False, caminho_traces=None):
+    """
+    `modo_filtro` e `top_k` controlam o pré-filtro heurístico (ver MODOS_FILTRO_LLM). Por padrão as
+    subpastas passam pelo pipeline assíncrono (`executar_pipeline_llm`); com `serial=True`, uma de
+    cada vez. Com `caminho_checkpoint`, cada subpasta concluída é registrada num journal; com
+    `retomar=True`, as subpastas já registradas e não alteradas são reaproveitadas (cada uma pode levar minutos nos modelos).
+    Com `caminho_traces`, cada subpasta processada gera uma linha JSONL com tempos, contagens e chamadas de LLM.
+    """
+    subpastas = [d for d in os.listdir(PASTA_RAIZ_PROCESSOS) if os.path.isdir(os.path.join(PASTA_RAIZ_PROCESSOS, d))]
+    checkpoint, assinaturas = None, {}
+    if caminho_checkpoint:
+        assinaturas = {nome: assinatura_subpasta(os.path.join(PASTA_RAIZ_PROCESSOS, nome)) for nome in subpastas}
+        identificacao = {
+            "pasta_raiz": os.path.abspath(PASTA_RAIZ_PROCESSOS), "modelos": [modelo["nome"] for modelo in LLM_MODELOS],
+            "filtro": [modo_filtro, top_k, LIMIAR_DECISAO_HEURISTICA]
         }
+        checkpoint = JournalCheckpoint(caminho_checkpoint, identificacao, retomar)
+    reaproveitados = checkpoint.reaproveitaveis(assinaturas) if checkpoint else {}
+    pendentes = [nome for nome in subpastas if nome not in reaproveitados]
+    resultados = {nome: reaproveitados[nome] for nome in subpastas if nome in reaproveitados}
+
+    traces = EscritorTraces(caminho_traces) if caminho_traces else None
 
-        for modelo in LLM_MODELOS:
-            nome = modelo["nome"]
-            modelo_llm = modelo["modelo"]
-            valor_llm, contexto = selecionar_valor_via_llm(paragrafos, modelo_llm)
-            if valor_llm is None:
-                try:
-                    valor_llm = fallback_resumo_llm(paragrafos, modelo_llm)
-                    contexto = "Resumo automatizado"
-                except Exception as e:
-                    valor_llm = f"Erro: {e}"
-                    contexto = "Erro no fallback"
-            linha_resultado[f"Resposta Interpretativa {nome}"] = valor_llm
-            linha_resultado[f"Resumo {nome}"] = contexto
-
-        resultados_finais.append(linha_resultado)
-        print_progress_bar(i + 1, len(subpastas), prefix='Progresso:', suffix=f'({nome_subpasta})', length=40)
-
-    return resultados_finais
+    def concluir(nome_subpasta, linha_resultado, sufixo, trace=None):
+        if checkpoint: checkpoint.registrar(nome_subpasta, linha_resultado, assinaturas[nome_subpasta])
+        if traces: traces.escrever(trace)
+        resultados[nome_subpasta] = linha_resultado
+        categoria = categoria_da_linha(linha_resultado, sufixo)
+        progresso.atualizar(f'({nome_subpasta})', categoria, erro=categoria in ("erro leitura", "erro"))
+
+    progresso = RelatorioProgresso(len(subpastas), concluidos=len(subpastas) - len(pendentes))
+    try:
+        if serial:
+            for nome_subpasta in pendentes: concluir(nome_subpasta, *processar_subpasta_llm(nome_subpasta, modo_filtro, top_k, bool(traces)))
+        elif pendentes:
+            import asyncio
+            estatisticas = asyncio.run(executar_pipeline_llm(pendentes, concluir, modo_filtro, top_k, bool(traces)))
+            progresso.finalizar()
+            print(resumir_estatisticas_pipeline(estatisticas))
+    finally:
+        progresso.finalizar()
+        if checkpoint: checkpoint.fechar()
+        if traces: traces.fechar()
+
+    return [resultados[nome] for nome in subpastas]
 
 def salvar_excel_comparativo(dados, nome_saida="resultado_comparativo"):
+    import pandas as pd
     df = pd.DataFrame(dados)
     df.to_excel(f"{nome_saida}.xlsx", index=False)
     print(f"\nArquivo '{nome_saida}.xlsx' salvo com sucesso.")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Extração comparativa de valores com LLMs locais.")
+    parser.add_argument("--resume", action="store_true", help="retoma uma execução interrompida, pulando as subpastas já registradas no checkpoint")
+    parser.add_argument("--servidor", metavar="HOST:PORTA", help="usa os modelos já carregados no servidor local (python servidor_modelos.py) em vez de carregá-los neste processo")
+    parser.add_argument("--stub", action="store_true", help="usa o modelo substituto determinístico, sem carregar os LLMs (testes e execuções a seco)")
+    parser.add_argument("--serial", action="store_true", help="processa uma subpasta de cada vez, sem o pipeline assíncrono (leitura e modelos em paralelo)")
+    parser.add_argument("--filtro", choices=MODOS_FILTRO_LLM, default=MODO_FILTRO_PADRAO, help=f"pré-filtro heurístico dos candidatos enviados ao LLM (padrão: {MODO_FILTRO_PADRAO})")
+    parser.add_argument("--top-k", type=int, default=TOP_K_LLM, help=f"candidatos enviados ao LLM nos modos topk/auto (padrão: {TOP_K_LLM})")
+    parser.add_argument("--trace", metavar="ARQUIVO.jsonl", help="grava um trace por documento (tempos, páginas, blocos, candidatos, chamadas de LLM)")
+    parser.add_argument("--profile", action="store_true", help="executa sob cProfile/tracemalloc e mostra os pontos quentes (use com --serial)")
+    args = parser.parse_args()
+    if args.servidor or args.stub: LLM_MODELOS = criar_modelos(endereco=args.servidor and interpretar_endereco(args.servidor), stub=args.stub)
+
+    nome_saida = "resultado_comparativo"
+    caminho_checkpoint = f"{nome_saida}.checkpoint.jsonl"
     inicio = time.time()
-    resultados = executar_extracao_com_llm()
-    salvar_excel_comparativo(resultados)
+    with perfilar(nome_saida) if args.profile else nullcontext():
+        resultados = executar_extracao_com_llm(
+            caminho_checkpoint=caminho_checkpoint, retomar=args.resume, modo_filtro=args.filtro, top_k=args.top_k,
+            serial=args.serial, caminho_traces=args.trace
+        )
+    salvar_excel_comparativo(resultados, nome_saida)
+    descartar_checkpoint(caminho_checkpoint)
     fim = time.time()
     print(f"\nTempo total: {fim - inicio:.2f} segundos")
\ No newline at end of file
@@ -1,16 +1,36 @@
+import io
 import os
 import re
-import sys
 import time
 import math
-import fitz  # PyMuPDF
-from docx import Document
-import pandas as pd
+import argparse
 from collections import defaultdict
+from functools import lru_cache
+from itertools import repeat
+from contextlib import nullcontext
+
+from motor_palavras_chave import construir_motor_palavras_chave, analisar_linha
+from valores_monetarios import converter_valor_para_numero_refinado, valor_do_match
+from cache_resultados import (
+    DIRETORIO_CACHE_PADRAO, calcular_hash_arquivo, calcular_hash_conteudo, calcular_hash_regras,
+    obter_conexao_cache, buscar_resultado, gravar_resultado
+)
+from cache_texto import ler_texto, gravar_texto
+from manifesto_incremental import assinatura_subpasta, carregar_manifesto, selecionar_inalterados, salvar_manifesto
+from saida_streaming import FORMATOS_SAIDA, abrir_escritor
+from leitura_antecipada import PROFUNDIDADE_LEITURA_PADRAO, descobrir_subpastas, ler_arquivo, ler_antecipadamente
+from checkpoint_execucao import JournalCheckpoint, descartar_checkpoint
+from instrumentacao import EscritorTraces, perfilar, tempos_em_ms
+from progresso import RelatorioProgresso
+
+# PyMuPDF (fitz), python-docx, pandas/numpy e o pool de processos são importados dentro das etapas que
+# os usam (leitura de PDF, leitura de .docx, exportação, --workers), para que importar o extrator e
+# iniciar uma execução seja rápido; `python benchmark_extracao.py --importacao` mede esse tempo.
 
 # --- Constantes e Configurações Essenciais ---
 PASTA_RAIZ_PROCESSOS = 'proc_representacoes/representacoes_SGE'
 MAX_PARAGRAPH_ETAPA_2 = 400
+BLOCOS_FINAIS_ADMISSIBILIDADE = 30
 
 # --- Padrões de Extração (Regex) ---
 PADROES_VALOR_REFINADOS = [
@@ -51,93 +71,190 @@ PALAVRAS_CHAVE_NEGATIVAS = [
     r"empenhos.*foram\s+anulados", r"valor\s+anulado\s+de", r"cancelamento\s+do\s+valor",
 ]
 
+# Compilado uma única vez: uma varredura por linha em vez de um re.search por palavra-chave
+MOTOR_PALAVRAS_CHAVE = construir_motor_palavras_chave(PALAVRAS_CHAVE_PONDERADAS, PALAVRAS_CHAVE_NEGATIVAS)
+
 SECOES_DECISAO_KEYWORDS = [r"DECIS\wO", r"VOTO", r"AC[OÓ]RD[AÃ]O", r"CONCLUS\wO", r"PELO\s+EXPOSTO"]
 
+PADROES_VALOR_COMPILADOS = [re.compile(p, re.IGNORECASE) for p in PADROES_VALOR_REFINADOS]
+RE_SECOES_DECISAO = re.compile("|".join(SECOES_DECISAO_KEYWORDS), re.IGNORECASE)
+
 RE_PROCESSO_PDF = re.compile(r"PROCESSO(?:.*?N[º°]?)?\s*[:\s]*([\w\d.-]+/\d{2,4})", re.IGNORECASE)
 RE_NATUREZA_PDF = re.compile(r"NATUREZA:\s*(.+)", re.IGNORECASE)
 RE_ACORDAO_PDF = re.compile(r"AC[OÓ]RD[AÃ]O Nº\s*([\w\d./-]+(?:-PLEN(?:V)?)?)", re.IGNORECASE)
 
+# Hierarquia de categorias na escolha do valor principal (da mais para a menos específica)
+CATEGORIAS_PRIORITARIAS = ['sancao_direta', 'objeto_principal', 'valor_consequencia', 'contexto_geral']
+# Modo multi-documento: um candidato destas categorias com score >= LIMIAR_ALTA_CONFIANCA encerra a busca na subpasta
+CATEGORIAS_ALTA_CONFIANCA = ['sancao_direta', 'objeto_principal']
+LIMIAR_ALTA_CONFIANCA = 1.5
+# Incrementar quando o formato do resultado de `analisar_documento` mudar (invalida o cache)
+VERSAO_ANALISE = 3
+
+@lru_cache(maxsize=1)
+def obter_hash_regras():
+    """Identifica o conjunto de regras ativo: qualquer alteração acima (ou na versão do PyMuPDF) invalida o cache de resultados."""
+    import fitz
+    return calcular_hash_regras(
+        PALAVRAS_CHAVE_PONDERADAS, PALAVRAS_CHAVE_NEGATIVAS, PADROES_VALOR_REFINADOS, MAX_PARAGRAPH_ETAPA_2,
+        BLOCOS_FINAIS_ADMISSIBILIDADE, SECOES_DECISAO_KEYWORDS,
+        [RE_PROCESSO_PDF.pattern, RE_NATUREZA_PDF.pattern, RE_ACORDAO_PDF.pattern], fitz.VersionBind, CATEGORIAS_PRIORITARIAS, VERSAO_ANALISE
+    )
+
 # --- Funções ---
 
-def print_progress_bar(iteration, total, prefix='', suffix='', length=50, fill='█'):
-    percent = ("{0:.1f}").format(100 * (iteration / float(total)))
-    filled_length = int(length * iteration // total)
-    bar = fill * filled_length + '-' * (length - filled_length)
-    sys.stdout.write(f'\r{prefix} |{bar}| {percent}% {suffix}')
-    sys.stdout.flush()
-    if iteration == total:
-        sys.stdout.write('\n')
-
-def converter_valor_para_numero_refinado(valor_str_original):
-    """Converte uma string de valor monetário para float. Retorna (valor, erro)."""
-    if not isinstance(valor_str_original, str): 
-        return None, "Entrada não é string"
-    valor_str = valor_str_original.lower()
-    valor_str = re.sub(r"^(r\$\s*|valor\s+de\s*r\$\s*|montante\s+de\s*r\$\s*)", "", valor_str).strip()
-    valor_str = re.sub(r"(\s*\((?:.*?)\)).*$", "", valor_str).strip()
-    multiplicador = 1
-    if 'tri' in valor_str: multiplicador = 1e12; valor_str = re.sub(r'tri(?:lh[oõ]es)?', '', valor_str).strip()
-    elif 'bilh' in valor_str or ' bi' in valor_str: multiplicador = 1e9; valor_str = re.sub(r'bilh[oõ]es|bi', '', valor_str).strip()
-    elif 'milh' in valor_str: multiplicador = 1e6; valor_str = re.sub(r'milh[oõ]es', '', valor_str).strip()
-    elif 'mil' in valor_str: multiplicador = 1e3; valor_str = re.sub(r'mil', '', valor_str).strip()
-    valor_str = re.sub(r'\s+', '', valor_str)
-    if re.search(r',\d{1,2}$', valor_str): valor_str = valor_str.replace('.', '').replace(',', '.')
-    else: valor_str = valor_str.replace(',', '')
-    if '.' in valor_str:
-        parts = valor_str.split('.'); valor_str = "".join(parts[:-1]) + "." + parts[-1] if len(parts[-1]) <= 2 and len(parts) > 1 else "".join(parts)
-    valor_str = re.sub(r'[^\d\.]', '', valor_str)
-    if valor_str.count('.') > 1: valor_str = valor_str.replace('.', '', valor_str.count('.') - 1)
-    if not valor_str: return None, "String vazia após limpeza"
-    try:
-        return float(valor_str) * multiplicador, None # Retorna tupla (valor, None)
-    except (ValueError, TypeError):
-        return None, "Erro de conversão" # Retorna tupla (None, erro)
+def analisar_contexto_linha(texto_linha, is_in_decision_section):
+    """Parte do score que depende só da linha; calculada uma vez e reaproveitada por todos os valores dela."""
+    negativo, pesos, best_keyword_category = analisar_linha(MOTOR_PALAVRAS_CHAVE, texto_linha.lower())
+    return {"negativo": negativo, "pesos": pesos, "categoria": best_keyword_category, "secao_decisao": is_in_decision_section}
 
-def calcular_score_valor(valor_numerico, texto_linha, is_in_decision_section):
-    score, best_keyword_category = 0.0, 'contexto_geral'
-    texto_linha_lower = texto_linha.lower()
+def pontuar_valor(valor_numerico, contexto_linha):
+    score = 0.0
     if valor_numerico > 0: score += math.log10(valor_numerico + 1) / 10
     
-    for neg_kw_regex in PALAVRAS_CHAVE_NEGATIVAS:
-        if re.search(neg_kw_regex, texto_linha_lower): return 0.0, 'negativo'
+    if contexto_linha["negativo"]: return 0.0, 'negativo'
             
-    max_keyword_weight = 0
-    for kw_regex, (peso, categoria) in PALAVRAS_CHAVE_PONDERADAS.items():
-        if re.search(kw_regex, texto_linha_lower):
-            score += peso
-            if peso > max_keyword_weight: max_keyword_weight = peso; best_keyword_category = categoria
+    for peso in contexto_linha["pesos"]: score += peso
             
-    if is_in_decision_section and best_keyword_category == 'sancao_direta': score += 1.0
+    if contexto_linha["secao_decisao"] and contexto_linha["categoria"] == 'sancao_direta': score += 1.0
     
-    return score, best_keyword_category
+    return score, contexto_linha["categoria"]
 
-def extrair_metadados_pdf(caminho_pdf):
+def calcular_score_valor(valor_numerico, texto_linha, is_in_decision_section):
+    return pontuar_valor(valor_numerico, analisar_contexto_linha(texto_linha, is_in_decision_section))
+
+def extrair_metadados_texto(texto_primeira_pagina):
+    """Aplica as regex de metadados sobre o texto da primeira página."""
     numero_processo_pdf, natureza, numero_acordao = "NÃO ENCONTRADO", "NÃO ESPECIFICADO", "NÃO ENCONTRADO"
+    match_acordao = RE_ACORDAO_PDF.search(texto_primeira_pagina)
+    if match_acordao: numero_acordao = match_acordao.group(1).strip()
+    match_processo = RE_PROCESSO_PDF.search(texto_primeira_pagina)
+    if match_processo: numero_processo_pdf = match_processo.group(1).strip()
+    match_natureza_direta = RE_NATUREZA_PDF.search(texto_primeira_pagina)
+    if match_natureza_direta: natureza = re.split(r'\s+INTERESSADO:', match_natureza_direta.group(1).strip().upper(), 1)[0].strip()
+    if numero_acordao != "NÃO ENCONTRADO" and natureza == "NÃO ESPECIFICADO": natureza = "ACÓRDÃO"
+    return {"numero_processo_pdf": numero_processo_pdf, "natureza": natureza, "numero_acordao": numero_acordao}
+
+def extrair_metadados_pdf(caminho_pdf):
+    import fitz
+    texto_primeira_pagina = ""
     try:
         with fitz.open(caminho_pdf) as pdf_doc:
-            if len(pdf_doc) > 0:
-                texto_primeira_pagina = pdf_doc[0].get_text("text")
-                match_acordao = RE_ACORDAO_PDF.search(texto_primeira_pagina)
-                if match_acordao: numero_acordao = match_acordao.group(1).strip()
-                match_processo = RE_PROCESSO_PDF.search(texto_primeira_pagina)
-                if match_processo: numero_processo_pdf = match_processo.group(1).strip()
-                match_natureza_direta = RE_NATUREZA_PDF.search(texto_primeira_pagina)
-                if match_natureza_direta: natureza = re.split(r'\s+INTERESSADO:', match_natureza_direta.group(1).strip().upper(), 1)[0].strip()
+            if len(pdf_doc) > 0: texto_primeira_pagina = pdf_doc[0].get_text("text")
     except Exception as e: print(f"  -> Erro ao extrair metadados: {e}")
-    if numero_acordao != "NÃO ENCONTRADO" and natureza == "NÃO ESPECIFICADO": natureza = "ACÓRDÃO"
-    return {"numero_processo_pdf": numero_processo_pdf, "natureza": natureza, "numero_acordao": numero_acordao}
+    return extrair_metadados_texto(texto_primeira_pagina)
 
-def obter_texto_documento(caminho_arquivo):
-    paragrafos = []
+def obter_blocos_pagina(pdf_doc, numero_pagina, cache_paginas):
+    """Blocos de texto de uma página em ordem de leitura; cada página é decodificada uma única vez."""
+    if numero_pagina not in cache_paginas:
+        pagina = pdf_doc[numero_pagina]
+        cache_paginas[numero_pagina] = [p[4] for p in sorted(pagina.get_text("blocks"), key=lambda b: (b[1], b[0])) if p[6] == 0]
+    return cache_paginas[numero_pagina]
+
+def iterar_blocos_iniciais(pdf_doc, cache_paginas, limites_paginas, limite=MAX_PARAGRAPH_ETAPA_2):
+    """Gera os blocos página a página, do início, e para assim que `limite` blocos forem produzidos."""
+    produzidos = 0
+    for numero_pagina in range(len(pdf_doc)):
+        if produzidos >= limite: return
+        limites_paginas.append(produzidos)
+        for bloco in obter_blocos_pagina(pdf_doc, numero_pagina, cache_paginas):
+            if produzidos >= limite: return
+            yield bloco
+            produzidos += 1
+
+def ler_blocos_finais(pdf_doc, cache_paginas, quantidade=BLOCOS_FINAIS_ADMISSIBILIDADE):
+    """Lê as páginas de trás para frente até reunir `quantidade` blocos; retorna-os em ordem de leitura."""
+    paginas_lidas, total = [], 0
+    for numero_pagina in range(len(pdf_doc) - 1, -1, -1):
+        blocos = obter_blocos_pagina(pdf_doc, numero_pagina, cache_paginas)
+        paginas_lidas.append(blocos); total += len(blocos)
+        if total >= quantidade: break
+    return [bloco for blocos in reversed(paginas_lidas) for bloco in blocos][-quantidade:]
+
+def registrar_tempo(tempos, etapa, inicio):
+    """Acumula em `tempos[etapa]` o tempo decorrido desde `inicio` (perf_counter) e retorna o instante atual. Nada faz sem `tempos`."""
+    agora = time.perf_counter()
+    if tempos is not None: tempos[etapa] = tempos.get(etapa, 0.0) + agora - inicio
+    return agora
+
+def carregar_documento(caminho_arquivo, completo=True, tempos=None, conteudo=None):
+    """
+    Lê o documento com uma única abertura do arquivo. Retorna um dict com os metadados e o texto da
+    primeira página (apenas PDF), a lista ordenada de blocos de texto, os limites de página (índice
+    do primeiro bloco de cada página) e os blocos finais usados na verificação de admissibilidade,
+    ou None se o documento não puder ser lido.
+    Com completo=False, em PDFs, "paragrafos" traz apenas a janela inicial analisada por
+    `analisar_conteudo_para_valores` e as páginas intermediárias não são decodificadas.
+    Com `tempos` (dict), acumula o tempo das etapas "abertura", "blocos" e "metadados".
+    Com `conteudo` (bytes do arquivo, já lidos), o documento é aberto da memória; o tipo vem de `caminho_arquivo`.
+    """
+    metadados, paragrafos, limites_paginas, paragrafos_finais, paginas, texto_primeira_pagina = {}, [], [], [], None, ""
+    inicio = time.perf_counter()
     try:
         if caminho_arquivo.lower().endswith('.docx'):
-            with open(caminho_arquivo, "rb") as docx_file:
-                doc = Document(docx_file); [paragrafos.append(p.text) for p in doc.paragraphs]
+            from docx import Document
+            with (io.BytesIO(conteudo) if conteudo is not None else open(caminho_arquivo, "rb")) as docx_file:
+                doc = Document(docx_file); inicio = registrar_tempo(tempos, "abertura", inicio)
+                paragrafos = [p.text for p in doc.paragraphs]
+            if paragrafos: limites_paginas.append(0)
+            paragrafos_finais = paragrafos[-BLOCOS_FINAIS_ADMISSIBILIDADE:]
+            registrar_tempo(tempos, "blocos", inicio)
         elif caminho_arquivo.lower().endswith('.pdf'):
-            with fitz.open(caminho_arquivo) as pdf_doc:
-                for pagina in pdf_doc: paragrafos.extend(p[4] for p in sorted(pagina.get_text("blocks"), key=lambda b: (b[1], b[0])) if p[6] == 0)
+            import fitz
+            with (fitz.open(stream=conteudo, filetype="pdf") if conteudo is not None else fitz.open(caminho_arquivo)) as pdf_doc:
+                inicio = registrar_tempo(tempos, "abertura", inicio)
+                texto_primeira_pagina = pdf_doc[0].get_text("text") if len(pdf_doc) > 0 else ""
+                inicio = registrar_tempo(tempos, "blocos", inicio)
+                metadados = extrair_metadados_texto(texto_primeira_pagina)
+                inicio = registrar_tempo(tempos, "metadados", inicio)
+                cache_paginas = {}
+                limite = MAX_PARAGRAPH_ETAPA_2 if not completo else math.inf
+                paragrafos = list(iterar_blocos_iniciais(pdf_doc, cache_paginas, limites_paginas, limite))
+                paragrafos_finais = ler_blocos_finais(pdf_doc, cache_paginas) if not completo else paragrafos[-BLOCOS_FINAIS_ADMISSIBILIDADE:]
+                registrar_tempo(tempos, "blocos", inicio)
+                paginas = len(pdf_doc)
     except Exception as e: print(f"  -> Erro ao ler documento {os.path.basename(caminho_arquivo)}: {e}"); return None
-    return paragrafos
+    return {"metadados": metadados, "paragrafos": paragrafos, "limites_paginas": limites_paginas, "paragrafos_finais": paragrafos_finais, "paginas": paginas, "texto_primeira_pagina": texto_primeira_pagina}
+
+def obter_texto_documento(caminho_arquivo):
+    documento = carregar_documento(caminho_arquivo)
+    return documento["paragrafos"] if documento is not None else None
+
+def documento_do_texto(caminho_arquivo, texto, completo=True, tempos=None):
+    """
+    Mesmo dict de `carregar_documento`, montado a partir do texto em cache (`TextoDocumento`, ver
+    cache_texto.py) sem abrir o arquivo. Com completo=False, em PDFs, só a janela inicial e os
+    blocos finais são decodificados. Com `tempos`, acumula as etapas "metadados" e "blocos".
+    """
+    inicio = time.perf_counter()
+    pdf = caminho_arquivo.lower().endswith('.pdf')
+    metadados = extrair_metadados_texto(texto.texto_primeira_pagina) if pdf else {}
+    inicio = registrar_tempo(tempos, "metadados", inicio)
+    limite = MAX_PARAGRAPH_ETAPA_2 if pdf and not completo else math.inf
+    paragrafos = texto.blocos(0, min(limite, len(texto)))
+    documento = {
+        "metadados": metadados, "paragrafos": paragrafos, "limites_paginas": [i for i in texto.limites_paginas if i < limite],
+        "paragrafos_finais": texto.blocos(-BLOCOS_FINAIS_ADMISSIBILIDADE), "paginas": texto.paginas, "texto_primeira_pagina": texto.texto_primeira_pagina
+    }
+    registrar_tempo(tempos, "blocos", inicio)
+    return documento
+
+def carregar_documento_cache_texto(caminho_arquivo, diretorio_cache, hash_documento, tempos=None, conteudo=None):
+    """
+    `carregar_documento(completo=False)` servido pelo cache de texto. Na falta, o documento é lido por
+    inteiro (as análises seguintes podem usar outra janela) e o texto é gravado no cache.
+    Retorna (documento ou None, origem no cache de texto: "acerto" ou "falha").
+    """
+    inicio, texto = time.perf_counter(), None
+    try: texto = ler_texto(diretorio_cache, hash_documento)
+    except Exception as e: print(f"  -> Erro ao consultar cache de texto: {e}")
+    registrar_tempo(tempos, "cache", inicio)
+    if texto is not None: return documento_do_texto(caminho_arquivo, texto, completo=False, tempos=tempos), "acerto"
+    documento = carregar_documento(caminho_arquivo, completo=True, tempos=tempos, conteudo=conteudo)
+    if documento is not None:
+        try: gravar_texto(diretorio_cache, hash_documento, documento["paragrafos"], documento["limites_paginas"], documento["texto_primeira_pagina"], documento["paginas"])
+        except Exception as e: print(f"  -> Erro ao gravar cache de texto: {e}")
+    return documento, "falha"
 
 def verificar_admissibilidade_e_arquivamento(lista_de_paragrafos):
     """
@@ -148,7 +265,7 @@ def verificar_admissibilidade_e_arquivamento(lista_de_paragrafos):
         return "Indeterminado"
     
     # Analisa o texto das últimas páginas (últimos 30 parágrafos/blocos)
-    texto_final = " ".join(lista_de_paragrafos[-30:]).upper()
+    texto_final = " ".join(lista_de_paragrafos[-BLOCOS_FINAIS_ADMISSIBILIDADE:]).upper()
 
     # Verifica separadamente a presença das palavras-chave essenciais
     flag_nao_conhecimento = "NÃO CONHECIMENTO" in texto_final
@@ -161,174 +278,483 @@ def verificar_admissibilidade_e_arquivamento(lista_de_paragrafos):
     
     return "Não"
 
-def analisar_conteudo_para_valores(lista_de_paragrafos):
-    if not lista_de_paragrafos: return None, "lista de parágrafos vazia"
+def coletar_candidatos(lista_de_paragrafos):
+    """Candidatos a valor principal, agrupados por categoria, na janela inicial do documento."""
     candidatos = defaultdict(list)
     
     for i, linha_texto in enumerate(lista_de_paragrafos):
         if i >= MAX_PARAGRAPH_ETAPA_2: break
         linha_texto = linha_texto.strip()
         if not linha_texto: continue
-        is_in_decision_section = any(re.search(kw, linha_texto, re.IGNORECASE) for kw in SECOES_DECISAO_KEYWORDS)
+        contexto_linha = None
 
-        for padrao_regex_str in PADROES_VALOR_REFINADOS:
-            for match in re.finditer(padrao_regex_str, linha_texto, re.IGNORECASE):
-                valor_num, _ = converter_valor_para_numero_refinado(match.group(0))
-                if valor_num and valor_num > 0:
-                    score, categoria = calcular_score_valor(valor_num, linha_texto, is_in_decision_section)
+        for padrao_regex in PADROES_VALOR_COMPILADOS:
+            for match in padrao_regex.finditer(linha_texto):
+                valor_num = valor_do_match(match)
+                if valor_num > 0:
+                    if contexto_linha is None: contexto_linha = analisar_contexto_linha(linha_texto, RE_SECOES_DECISAO.search(linha_texto) is not None)
+                    score, categoria = pontuar_valor(valor_num, contexto_linha)
                     if score > 0 and categoria != 'negativo':
                         candidatos[categoria].append({"valor_str": match.group(0), "valor_num": valor_num, "score": score})
+    return candidatos
+
+def melhores_por_categoria(candidatos):
+    """Maior score de cada categoria (o primeiro encontrado em caso de empate)."""
+    return {categoria: max(lista, key=lambda x: x['score']) for categoria, lista in candidatos.items()}
+
+def escolher_por_hierarquia(melhores):
+    """Aplica a hierarquia de categorias. Retorna (candidato, categoria) ou (None, None)."""
+    for categoria_prioritaria in CATEGORIAS_PRIORITARIAS:
+        if categoria_prioritaria in melhores:
+            return melhores[categoria_prioritaria], categoria_prioritaria
+    return None, None
 
-    for categoria_prioritaria in ['sancao_direta', 'objeto_principal', 'valor_consequencia', 'contexto_geral']:
-        if categoria_prioritaria in candidatos:
-            melhor_candidato = max(candidatos[categoria_prioritaria], key=lambda x: x['score'])
-            return [melhor_candidato["valor_str"]], f"etapa 2 - hierarquia: {categoria_prioritaria}"
+def analisar_conteudo_para_valores(lista_de_paragrafos):
+    if not lista_de_paragrafos: return None, "lista de parágrafos vazia"
+    melhor_candidato, categoria_prioritaria = escolher_por_hierarquia(melhores_por_categoria(coletar_candidatos(lista_de_paragrafos)))
+    if melhor_candidato:
+        return [melhor_candidato["valor_str"]], f"etapa 2 - hierarquia: {categoria_prioritaria}"
             
     return None, "nenhum valor relevante encontrado"
 
-def processar_documentos(pasta_raiz):
-    resultados_finais = {}
-    subpastas = [d for d in os.listdir(pasta_raiz) if os.path.isdir(os.path.join(pasta_raiz, d))]
-    
-    print_progress_bar(0, len(subpastas), prefix='Progresso:', suffix='Completo', length=40)
-    for i, nome_subpasta in enumerate(subpastas):
-        caminho_subpasta = os.path.join(pasta_raiz, nome_subpasta)
-        
-        documento_encontrado_path, nome_arquivo_processado = None, "Nenhum Documento Encontrado"
-        for ext in ['.pdf', '.docx', '.doc']:
-            for arq in sorted(os.listdir(caminho_subpasta)):
-                if arq.lower().endswith(ext) and not arq.startswith('~$'):
-                    documento_encontrado_path, nome_arquivo_processado = os.path.join(caminho_subpasta, arq), arq
-                    break
-            if documento_encontrado_path: break
-            
-        metadados = {
-            "nome_subpasta_original": nome_subpasta, "nome_arquivo_original": nome_arquivo_processado,
-            "numero_processo_pdf": "NÃO ENCONTRADO", "natureza": "NÃO ESPECIFICADO", 
-            "numero_acordao": "NÃO ENCONTRADO", "status_admissibilidade": "Indeterminado"
-        }
+def categoria_do_criterio(criterio):
+    """Forma curta do critério usada nas contagens do progresso ('objeto_principal', 'arquivado', ...)."""
+    if criterio == "Sim": return "arquivado"
+    if criterio.startswith("etapa 2 - hierarquia: "): return criterio[len("etapa 2 - hierarquia: "):].split(" [")[0]
+    return criterio
 
-        if not documento_encontrado_path:
-            resultados_finais[nome_subpasta] = {"metadados": metadados, "valores_extraidos": None, "criterio_usado": "documento nao encontrado"}
-            print_progress_bar(i + 1, len(subpastas), prefix='Progresso:', suffix=f'({nome_subpasta} - Sem Doc)', length=40)
-            continue
+def inferir_natureza_pela_pasta(metadados, pasta_raiz):
+    # Inferência de natureza pela pasta RAIZ (fallback)
+    if metadados["natureza"] == "NÃO ESPECIFICADO":
+        pasta_raiz_lower_norm = os.path.basename(pasta_raiz).lower().replace(" ", "_")
+        if "denuncia" in pasta_raiz_lower_norm: metadados["natureza"] = "DENUNCIA"
+        elif "representacoes_sge" in pasta_raiz_lower_norm: metadados["natureza"] = "REPRESENTAÇÃO DA SGE"
+        elif "representacao" in pasta_raiz_lower_norm: metadados["natureza"] = "REPRESENTAÇÃO"
 
-        if documento_encontrado_path.lower().endswith('.pdf'): metadados.update(extrair_metadados_pdf(documento_encontrado_path))
-        
-        # Inferência de natureza pela pasta RAIZ (fallback)
-        if metadados["natureza"] == "NÃO ESPECIFICADO":
-            pasta_raiz_lower_norm = os.path.basename(pasta_raiz).lower().replace(" ", "_")
-            if "denuncia" in pasta_raiz_lower_norm: metadados["natureza"] = "DENUNCIA"
-            elif "representacoes_sge" in pasta_raiz_lower_norm: metadados["natureza"] = "REPRESENTAÇÃO DA SGE"
-            elif "representacao" in pasta_raiz_lower_norm: metadados["natureza"] = "REPRESENTAÇÃO"
-        
-        lista_de_paragrafos = obter_texto_documento(documento_encontrado_path)
-        if lista_de_paragrafos is None:
-            resultados_finais[nome_subpasta] = {"metadados": metadados, "valores_extraidos": None, "criterio_usado": "erro_leitura_conteudo"}
-            print_progress_bar(i + 1, len(subpastas), prefix='Progresso:', suffix=f'({nome_subpasta} - Erro Leitura)', length=40)
-            continue
-
-        status_admissibilidade = verificar_admissibilidade_e_arquivamento(lista_de_paragrafos)
-        metadados["status_admissibilidade"] = status_admissibilidade
-        
-        valores_finais, criterio_usado = (None, status_admissibilidade) if status_admissibilidade == "Sim" else analisar_conteudo_para_valores(lista_de_paragrafos)
-        resultados_finais[nome_subpasta] = {"metadados": metadados, "valores_extraidos": valores_finais, "criterio_usado": criterio_usado}
-        
-        print_progress_bar(i + 1, len(subpastas), prefix='Progresso:', suffix=f'({nome_subpasta})', length=40)
+def analisar_documento(caminho_documento, tempos=None, contagens=None, conteudo=None, documento=None):
+    """
+    Tudo o que depende apenas do conteúdo do documento (e, portanto, pode ir para o cache). None se ilegível.
+    Com `tempos`, acumula também as etapas "admissibilidade" e "pontuacao" (ver `carregar_documento`);
+    com `contagens` (dict), registra páginas, blocos lidos e candidatos por categoria.
+    `conteudo`: bytes do documento já lidos (ver `carregar_documento`); `documento`: o documento já
+    carregado (ver `carregar_documento_cache_texto`), quando só a pontuação deve ser refeita.
+    """
+    if documento is None: documento = carregar_documento(caminho_documento, completo=False, tempos=tempos, conteudo=conteudo)
+    if documento is None: return None
+    if contagens is not None: contagens.update(paginas=documento["paginas"], blocos=len(documento["paragrafos"]), blocos_finais=len(documento["paragrafos_finais"]))
+    inicio = time.perf_counter()
+    status_admissibilidade = verificar_admissibilidade_e_arquivamento(documento["paragrafos_finais"])
+    inicio = registrar_tempo(tempos, "admissibilidade", inicio)
+    melhores, valor_numerico = {}, None
+    if status_admissibilidade == "Sim":
+        valores_finais, criterio_usado = None, status_admissibilidade
+    elif not documento["paragrafos"]:
+        valores_finais, criterio_usado = None, "lista de parágrafos vazia"
+    else:
+        candidatos = coletar_candidatos(documento["paragrafos"])
+        if contagens is not None: contagens["candidatos"] = {categoria: len(lista) for categoria, lista in candidatos.items()}
+        melhores = melhores_por_categoria(candidatos)
+        melhor_candidato, categoria_prioritaria = escolher_por_hierarquia(melhores)
+        valores_finais, criterio_usado = ([melhor_candidato["valor_str"]], f"etapa 2 - hierarquia: {categoria_prioritaria}") if melhor_candidato else (None, "nenhum valor relevante encontrado")
+        if melhor_candidato: valor_numerico = melhor_candidato["valor_num"]
+    registrar_tempo(tempos, "pontuacao", inicio)
+    return {
+        "metadados_documento": documento["metadados"], "status_admissibilidade": status_admissibilidade,
+        "valores_extraidos": valores_finais, "valor_numerico": valor_numerico, "criterio_usado": criterio_usado,
+        "melhores_por_categoria": melhores
+    }
+
+def obter_analise(caminho_documento, diretorio_cache=None, medidas=None, conteudo=None, texto_em_cache=False):
+    """
+    Análise do documento, lida do cache quando possível. Retorna (analise ou None, origem no cache).
+    Com `medidas` ({"tempos": {...}}), acumula os tempos por etapa (inclusive "cache") e as contagens do documento.
+    Com `conteudo` (bytes já lidos), nem o hash do cache nem a análise voltam a ler o arquivo.
+    Com `texto_em_cache`, o cache de resultados é ignorado: a pontuação é sempre refeita sobre o texto
+    do cache de texto (ver cache_texto.py), e a origem passa a ser a do cache de texto.
+    """
+    analise, origem_cache, hash_documento = None, None, None
+    tempos, inicio = (medidas["tempos"] if medidas is not None else None), time.perf_counter()
+    if diretorio_cache:
+        try:
+            hash_documento = calcular_hash_conteudo(conteudo) if conteudo is not None else calcular_hash_arquivo(caminho_documento)
+            if not texto_em_cache:
+                analise = buscar_resultado(obter_conexao_cache(diretorio_cache), hash_documento, obter_hash_regras())
+                origem_cache = "acerto" if analise is not None else "falha"
+        except Exception as e: print(f"  -> Erro ao consultar cache: {e}")
+        registrar_tempo(tempos, "cache", inicio)
+    if texto_em_cache and hash_documento:
+        documento, origem_cache = carregar_documento_cache_texto(caminho_documento, diretorio_cache, hash_documento, tempos, conteudo)
+        if documento is not None: analise = analisar_documento(caminho_documento, tempos, medidas, documento=documento)
+    elif analise is None:
+        analise = analisar_documento(caminho_documento, tempos, medidas, conteudo)
+        if analise is not None and hash_documento:
+            try: gravar_resultado(obter_conexao_cache(diretorio_cache), hash_documento, obter_hash_regras(), analise)
+            except Exception as e: print(f"  -> Erro ao gravar cache: {e}")
+    return analise, origem_cache
+
+def listar_documentos(caminho_subpasta):
+    """Documentos da subpasta em ordem de preferência (.pdf, .docx, .doc; depois nome). O primeiro é o principal."""
+    arquivos = sorted(os.listdir(caminho_subpasta))
+    return [arq for ext in ['.pdf', '.docx', '.doc'] for arq in arquivos if arq.lower().endswith(ext) and not arq.startswith('~$')]
+
+def pre_ler_subpasta(pasta_raiz, nome_subpasta):
+    """
+    Leitura antecipada de uma subpasta (roda numa thread de `ler_antecipadamente`): lista os documentos
+    e lê o principal para a memória. Se a leitura falhar, o conteúdo fica None e a análise lê do disco.
+    """
+    caminho_subpasta = os.path.join(pasta_raiz, nome_subpasta)
+    documentos, conteudo = listar_documentos(caminho_subpasta), None
+    if documentos and documentos[0].lower().endswith(('.pdf', '.docx')):
+        try: conteudo = ler_arquivo(os.path.join(caminho_subpasta, documentos[0]))
+        except OSError: pass
+    return {"documentos": documentos, "conteudo": conteudo}
+
+def tem_candidato_alta_confianca(melhores):
+    return any(categoria in melhores and melhores[categoria]["score"] >= LIMIAR_ALTA_CONFIANCA for categoria in CATEGORIAS_ALTA_CONFIANCA)
+
+def combinar_documentos(caminho_subpasta, documentos, analise_principal, diretorio_cache=None, texto_em_cache=False):
+    """
+    Modo multi-documento: junta os melhores candidatos de cada documento da subpasta (o principal
+    primeiro) e aplica a hierarquia sobre o conjunto. Para de abrir documentos assim que houver um
+    candidato de alta confiança em CATEGORIAS_ALTA_CONFIANCA. Retorna (valores, criterio, valor numérico).
+    """
+    melhores = {}
+    for indice, nome_arquivo in enumerate(documentos):
+        analise = analise_principal if indice == 0 else obter_analise(os.path.join(caminho_subpasta, nome_arquivo), diretorio_cache, texto_em_cache=texto_em_cache)[0]
+        if analise is None: continue
+        for categoria, candidato in analise["melhores_por_categoria"].items():
+            if categoria not in melhores or candidato["score"] > melhores[categoria]["score"]:
+                melhores[categoria] = dict(candidato, arquivo=nome_arquivo)
+        if tem_candidato_alta_confianca(melhores): break
+
+    melhor_candidato, categoria_prioritaria = escolher_por_hierarquia(melhores)
+    if melhor_candidato is None:
+        return analise_principal["valores_extraidos"], analise_principal["criterio_usado"], analise_principal.get("valor_numerico")
+    origem = "" if melhor_candidato["arquivo"] == documentos[0] else f" [{melhor_candidato['arquivo']}]"
+    return [melhor_candidato["valor_str"]], f"etapa 2 - hierarquia: {categoria_prioritaria}{origem}", melhor_candidato["valor_num"]
+
+def processar_subpasta(pasta_raiz, nome_subpasta, diretorio_cache=None, multi_documentos=False, rastrear=False, pre_leitura=None, texto_em_cache=False):
+    """
+    Processa uma única subpasta de processo. Retorna (resultado, info), onde info traz o sufixo da
+    barra de progresso e a origem do resultado no cache ("acerto", "falha" ou None sem cache).
+    Com `rastrear`, info traz também o trace do documento principal (ver instrumentacao.py).
+    `pre_leitura` é o resultado de `pre_ler_subpasta`, quando a subpasta foi lida antecipadamente.
+    `texto_em_cache`: ver `obter_analise`.
+    """
+    medidas, inicio = ({"tempos": {}} if rastrear else None), time.perf_counter()
+    resultado, info = analisar_subpasta(pasta_raiz, nome_subpasta, diretorio_cache, multi_documentos, medidas, pre_leitura, texto_em_cache)
+    if rastrear:
+        metadados = resultado["metadados"]
+        info["trace"] = {
+            "subpasta": nome_subpasta, "arquivo": metadados["nome_arquivo_original"], "pid": os.getpid(),
+            "tempo_total_ms": round((time.perf_counter() - inicio) * 1000, 3), "tempos_ms": tempos_em_ms(medidas.pop("tempos")),
+            "cache": info["cache"], "status_admissibilidade": metadados["status_admissibilidade"], "criterio": resultado["criterio_usado"],
+            **medidas
+        }
+    return resultado, info
+
+def analisar_subpasta(pasta_raiz, nome_subpasta, diretorio_cache=None, multi_documentos=False, medidas=None, pre_leitura=None, texto_em_cache=False):
+    """
+    Corpo de `processar_subpasta`. Metadados e admissibilidade vêm sempre do documento principal;
+    com `multi_documentos`, o valor é escolhido entre os candidatos de todos os documentos da subpasta.
+    """
+    caminho_subpasta = os.path.join(pasta_raiz, nome_subpasta)
+    documentos = pre_leitura["documentos"] if pre_leitura else listar_documentos(caminho_subpasta)
+    nome_arquivo_processado = documentos[0] if documentos else "Nenhum Documento Encontrado"
         
-    return resultados_finais
+    metadados = {
+        "nome_subpasta_original": nome_subpasta, "nome_arquivo_original": nome_arquivo_processado,
+        "numero_processo_pdf": "NÃO ENCONTRADO", "natureza": "NÃO ESPECIFICADO", 
+        "numero_acordao": "NÃO ENCONTRADO", "status_admissibilidade": "Indeterminado"
+    }
+
+    if not documentos:
+        return {"metadados": metadados, "valores_extraidos": None, "criterio_usado": "documento nao encontrado"}, {"sufixo": f'({nome_subpasta} - Sem Doc)', "cache": None}
+
+    analise, origem_cache = obter_analise(os.path.join(caminho_subpasta, documentos[0]), diretorio_cache, medidas, pre_leitura and pre_leitura["conteudo"], texto_em_cache)
+
+    if analise is not None: metadados.update(analise["metadados_documento"])
+    inferir_natureza_pela_pasta(metadados, pasta_raiz)
+    
+    if analise is None:
+        return {"metadados": metadados, "valores_extraidos": None, "criterio_usado": "erro_leitura_conteudo"}, {"sufixo": f'({nome_subpasta} - Erro Leitura)', "cache": origem_cache}
+
+    metadados["status_admissibilidade"] = analise["status_admissibilidade"]
+    valores_finais, criterio_usado, valor_numerico = analise["valores_extraidos"], analise["criterio_usado"], analise.get("valor_numerico")
+    if multi_documentos and len(documentos) > 1 and analise["status_admissibilidade"] != "Sim":
+        valores_finais, criterio_usado, valor_numerico = combinar_documentos(caminho_subpasta, documentos, analise, diretorio_cache, texto_em_cache)
+    resultado = {"metadados": metadados, "valores_extraidos": valores_finais, "criterio_usado": criterio_usado}
+    if valor_numerico is not None: resultado["valor_numerico"] = valor_numerico
+    return resultado, {"sufixo": f'({nome_subpasta})', "cache": origem_cache}
+
+def iterar_processamento(pasta_raiz, subpastas, workers=1, diretorio_cache=None, multi_documentos=False, rastrear=False, leitura_antecipada=PROFUNDIDADE_LEITURA_PADRAO, texto_em_cache=False):
+    """
+    Gera (resultado, info) de cada subpasta na ordem de `subpastas`, em série ou num pool de processos.
+    Em série, com `leitura_antecipada` > 0, as próximas `leitura_antecipada` subpastas são listadas e
+    têm o documento principal lido em threads enquanto a atual é analisada (ver leitura_antecipada.py).
+    """
+    argumentos = (repeat(pasta_raiz), subpastas, repeat(diretorio_cache), repeat(multi_documentos), repeat(rastrear), repeat(None), repeat(texto_em_cache))
+    if workers > 1 and len(subpastas) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(processar_subpasta, *argumentos, chunksize=max(1, len(subpastas) // (workers * 4)))
+    elif leitura_antecipada > 0:
+        for nome, pre_leitura in ler_antecipadamente(subpastas, lambda nome: pre_ler_subpasta(pasta_raiz, nome), leitura_antecipada):
+            yield processar_subpasta(pasta_raiz, nome, diretorio_cache, multi_documentos, rastrear, pre_leitura, texto_em_cache)
+    else:
+        yield from map(processar_subpasta, *argumentos)
+
+def iterar_resultados(pasta_raiz, workers=1, diretorio_cache=None, caminho_manifesto=None, caminho_checkpoint=None, retomar=False, multi_documentos=False, caminho_traces=None, leitura_antecipada=PROFUNDIDADE_LEITURA_PADRAO, texto_em_cache=False):
+    """
+    Gera (nome_subpasta, resultado) na ordem das subpastas, à medida que cada uma termina, sem
+    acumular os resultados. Com workers > 1 as subpastas são distribuídas num pool de processos;
+    os resultados são consumidos na ordem original, de modo que a saída é idêntica à da execução
+    serial. Com `diretorio_cache`, documentos já analisados com as mesmas regras são lidos do
+    cache em vez de reprocessados. Com `caminho_manifesto` (modo incremental), só as subpastas com
+    arquivos novos, removidos ou alterados desde a última execução são processadas; as demais
+    reaproveitam o resultado anterior. Com `caminho_checkpoint`, cada subpasta concluída é
+    registrada num journal; com `retomar=True`, as já registradas e não alteradas não são reprocessadas. Com
+    `multi_documentos`, o valor é escolhido entre todos os documentos de cada subpasta. Com
+    `caminho_traces`, cada subpasta processada gera uma linha JSONL com tempos e contagens.
+    `leitura_antecipada` é quantas subpastas são lidas à frente na execução serial (0 desliga).
+    Com `texto_em_cache` (requer `diretorio_cache`), só a pontuação é refeita, sobre o texto já
+    extraído dos documentos (ver cache_texto.py), para reavaliar rapidamente mudanças nos pesos.
+    """
+    subpastas = descobrir_subpastas(pasta_raiz)
+    contagem_cache = defaultdict(int)
+    # manifesto e checkpoint só valem para execuções no mesmo modo
+    hash_regras = obter_hash_regras()
+    hash_execucao = calcular_hash_regras(hash_regras, "multi_documentos", CATEGORIAS_ALTA_CONFIANCA, LIMIAR_ALTA_CONFIANCA) if multi_documentos else hash_regras
+
+    assinaturas, reaproveitados, resultados_manifesto = {}, {}, {}
+    if caminho_manifesto or caminho_checkpoint:
+        assinaturas = {nome: assinatura_subpasta(os.path.join(pasta_raiz, nome)) for nome in subpastas}
+    if caminho_manifesto:
+        reaproveitados = selecionar_inalterados(carregar_manifesto(caminho_manifesto), pasta_raiz, hash_execucao, assinaturas)
+        print(f"Modo incremental: {len(subpastas) - len(reaproveitados)} subpastas novas ou alteradas, {len(reaproveitados)} reaproveitadas")
+    checkpoint = None
+    if caminho_checkpoint:
+        checkpoint = JournalCheckpoint(caminho_checkpoint, {"pasta_raiz": os.path.abspath(pasta_raiz), "hash_regras": hash_execucao}, retomar)
+        reaproveitados.update(checkpoint.reaproveitaveis(assinaturas))
+    a_processar = [nome for nome in subpastas if nome not in reaproveitados]
+    processados = iterar_processamento(pasta_raiz, a_processar, workers, diretorio_cache, multi_documentos, bool(caminho_traces), leitura_antecipada, texto_em_cache)
+    traces = EscritorTraces(caminho_traces) if caminho_traces else None
+    progresso = RelatorioProgresso(len(a_processar))
+    try:
+        for nome_subpasta in subpastas:
+            if nome_subpasta in reaproveitados:
+                resultado = reaproveitados[nome_subpasta]
+            else:
+                resultado, info = next(processados)
+                if info["cache"]: contagem_cache[info["cache"]] += 1
+                if checkpoint: checkpoint.registrar(nome_subpasta, resultado, assinaturas[nome_subpasta])
+                if traces: traces.escrever(info["trace"])
+                progresso.atualizar(info["sufixo"], categoria_do_criterio(resultado["criterio_usado"]), erro=resultado["criterio_usado"] == "erro_leitura_conteudo")
+            if caminho_manifesto: resultados_manifesto[nome_subpasta] = resultado
+            yield nome_subpasta, resultado
+    finally:
+        progresso.finalizar()
+        if checkpoint: checkpoint.fechar()
+        if traces: traces.fechar()
+
+    if diretorio_cache: print(f"Cache de {'texto' if texto_em_cache else 'resultados'}: {contagem_cache['acerto']} acertos, {contagem_cache['falha']} faltas")
+    if caminho_manifesto: salvar_manifesto(caminho_manifesto, pasta_raiz, hash_execucao, assinaturas, resultados_manifesto)
+
+def processar_documentos(pasta_raiz, workers=1, diretorio_cache=None, caminho_manifesto=None, caminho_checkpoint=None, retomar=False, multi_documentos=False, caminho_traces=None, leitura_antecipada=PROFUNDIDADE_LEITURA_PADRAO, texto_em_cache=False):
+    """Processa todas as subpastas de `pasta_raiz` (ver `iterar_resultados`) e devolve os resultados num dict."""
+    return dict(iterar_resultados(pasta_raiz, workers, diretorio_cache, caminho_manifesto, caminho_checkpoint, retomar, multi_documentos, caminho_traces, leitura_antecipada, texto_em_cache))
+
+def valor_principal_numerico(dados_proc):
+    """Valor escolhido em float (0.0 sem valor). Usa o número guardado na análise; só converte o texto de novo em resultados antigos (cache/checkpoint)."""
+    if dados_proc.get("valor_numerico") is not None: return dados_proc["valor_numerico"]
+    valor_principal_lista = dados_proc.get("valores_extraidos")
+    if valor_principal_lista and isinstance(valor_principal_lista, list) and valor_principal_lista[0] is not None:
+        valor_num, _ = converter_valor_para_numero_refinado(valor_principal_lista[0])
+        if valor_num is not None: return valor_num
+    return 0.0
+
+def montar_linha_planilha(nome_pasta_proc, dados_proc):
+    metadados = dados_proc.get("metadados", {})
+    return {
+        "Nome Pasta Original": nome_pasta_proc,
+        "Número Processo (PDF)": metadados.get("numero_processo_pdf", "N/A"),
+        "Número Acórdão": metadados.get("numero_acordao", "N/A"),
+        "Natureza": metadados.get("natureza", "N/A"),
+        "Arquivamento por Admissibilidade": metadados.get("status_admissibilidade", "Indeterminado"),
+        "Valor Principal (R$)": valor_principal_numerico(dados_proc),
+        "Critério de Extração": dados_proc.get("criterio_usado", "N/A"),
+        "Nome Arquivo Processado": metadados.get("nome_arquivo_original", "N/A"),
+        "Informações OpenAI": ""
+    }
+
+# Colunas de poucos valores distintos, guardadas como categorias na tabela de resultados
+COLUNAS_CATEGORICAS = ["Natureza", "Arquivamento por Admissibilidade", "Critério de Extração"]
+
+def montar_tabela_resultados(resultados_completos):
+    """
+    Tabela colunar tipada com as mesmas colunas de `montar_linha_planilha`: valor em float64 e as
+    colunas de COLUNAS_CATEGORICAS como categorias (cores e agregados saem dela vetorizados).
+    """
+    import numpy as np
+    import pandas as pd
+    nomes, dados = list(resultados_completos), list(resultados_completos.values())
+    metadados = [dados_proc.get("metadados", {}) for dados_proc in dados]
+    df = pd.DataFrame({
+        "Nome Pasta Original": nomes,
+        "Número Processo (PDF)": [m.get("numero_processo_pdf", "N/A") for m in metadados],
+        "Número Acórdão": [m.get("numero_acordao", "N/A") for m in metadados],
+        "Natureza": [m.get("natureza", "N/A") for m in metadados],
+        "Arquivamento por Admissibilidade": [m.get("status_admissibilidade", "Indeterminado") for m in metadados],
+        "Valor Principal (R$)": np.fromiter((valor_principal_numerico(dados_proc) for dados_proc in dados), dtype=np.float64, count=len(dados)),
+        "Critério de Extração": [dados_proc.get("criterio_usado", "N/A") for dados_proc in dados],
+        "Nome Arquivo Processado": [m.get("nome_arquivo_original", "N/A") for m in metadados],
+        "Informações OpenAI": "",
+    })
+    return df.astype({coluna: "category" for coluna in COLUNAS_CATEGORICAS})
+
+# Esquema de cores das linhas da planilha: nome do estilo -> (cor de fundo, cor da fonte)
+ESTILOS_LINHA = {
+    "vermelho": ("E63946", "FFFFFF"),
+    "verde": ("2A9D8F", "FFFFFF"),
+    "amarelo": ("f8fb74", "000000"),
+    "laranja": ("f79256", "000000"),
+}
+
+# Regras de cor, em ordem de prioridade: (estilo, coluna, texto, exato). Com exato, a coluna tem de
+# ser igual ao texto; senão, basta contê-lo. A primeira regra satisfeita define a cor da linha.
+REGRAS_ESTILO = [
+    ("vermelho", "Arquivamento por Admissibilidade", "Sim", True),
+    ("verde", "Critério de Extração", "objeto_principal", False),
+    ("amarelo", "Critério de Extração", "contexto_geral", False),
+    ("laranja", "Critério de Extração", "nenhum valor", False),
+]
+
+def classificar_estilo_linha(linha):
+    """Nome do estilo (chave de ESTILOS_LINHA) de uma linha da planilha, ou None para sem cor."""
+    for estilo, coluna, texto, exato in REGRAS_ESTILO:
+        if (linha[coluna] == texto) if exato else (texto in linha[coluna]): return estilo
+    return None
+
+def classificar_estilos(df):
+    """
+    `classificar_estilo_linha` vetorizado sobre a tabela de `montar_tabela_resultados`: cada regra é
+    avaliada uma vez por categoria distinta da coluna e espalhada para as linhas pelos códigos.
+    """
+    import numpy as np
+    import pandas as pd
+    condicoes = []
+    for _, coluna, texto, exato in REGRAS_ESTILO:
+        categorias = df[coluna].cat.categories.astype(str)
+        casa = np.asarray(categorias == texto if exato else categorias.str.contains(texto, regex=False))
+        condicoes.append(np.append(casa, False)[df[coluna].cat.codes.to_numpy()])  # código -1 (vazio) não casa
+    return pd.Series(np.select(condicoes, [regra[0] for regra in REGRAS_ESTILO], default=None), index=df.index, dtype="category")
+
+def resumir_por_estilo(df, estilos):
+    """Quantidade de linhas e soma do valor principal por estilo ("sem cor" incluído)."""
+    grupos = estilos.cat.add_categories("sem cor").fillna("sem cor")
+    return df["Valor Principal (R$)"].groupby(grupos, observed=True).agg(["count", "sum"])
+
+def adicionar_formatacao_condicional(planilha, df):
+    """Uma regra de formatação condicional do Excel por entrada de REGRAS_ESTILO, cobrindo todas as linhas de dados."""
+    from openpyxl.formatting.rule import FormulaRule
+    from openpyxl.styles import Font, PatternFill
+    from openpyxl.utils import get_column_letter
+    if df.empty: return
+    intervalo = f"A2:{get_column_letter(len(df.columns))}{len(df) + 1}"
+    for estilo, coluna, texto, exato in REGRAS_ESTILO:
+        celula = f"${get_column_letter(df.columns.get_loc(coluna) + 1)}2"
+        formula = f'EXACT({celula},"{texto}")' if exato else f'ISNUMBER(FIND("{texto}",{celula}))'
+        cor_fundo, cor_fonte = (cor.upper() for cor in ESTILOS_LINHA[estilo])
+        planilha.conditional_formatting.add(intervalo, FormulaRule(
+            formula=[formula], stopIfTrue=True,
+            fill=PatternFill(start_color=cor_fundo, end_color=cor_fundo, fill_type="solid"), font=Font(color=cor_fonte)
+        ))
 
 def exportar_para_excel(resultados_completos, nome_arquivo_base_excel):
+    """Retorna True se a planilha foi gravada (com ou sem formatação)."""
     if not resultados_completos:
         print("Nenhum resultado para exportar.")
-        return
-
-    linhas_para_df = []
-    
-    for nome_pasta_proc, dados_proc in resultados_completos.items():
-        metadados = dados_proc.get("metadados", {})
-        valor_principal_lista = dados_proc.get("valores_extraidos")
-        
-        valor_final_num = 0.0
-        if valor_principal_lista and isinstance(valor_principal_lista, list) and valor_principal_lista[0] is not None:
-            valor_num, _ = converter_valor_para_numero_refinado(valor_principal_lista[0])
-            if valor_num is not None:
-                valor_final_num = valor_num
-        
-        linhas_para_df.append({
-            "Nome Pasta Original": nome_pasta_proc,
-            "Número Processo (PDF)": metadados.get("numero_processo_pdf", "N/A"),
-            "Número Acórdão": metadados.get("numero_acordao", "N/A"),
-            "Natureza": metadados.get("natureza", "N/A"),
-            "Arquivamento por Admissibilidade": metadados.get("status_admissibilidade", "Indeterminado"),
-            "Valor Principal (R$)": valor_final_num,
-            "Critério de Extração": dados_proc.get("criterio_usado", "N/A"),
-            "Nome Arquivo Processado": metadados.get("nome_arquivo_original", "N/A"),
-            "Informações OpenAI": ""
-        })
-
-    df = pd.DataFrame(linhas_para_df)
-
-    # funcao para aplicar esquema de cores no excel
-    def aplicar_estilo_de_linha(row):
-        
-        cor_vermelha = 'background-color: #E63946; color: #FFFFFF'
-        cor_verde =    'background-color: #2A9D8F; color: #FFFFFF'
-        cor_amarela =  'background-color: #f8fb74; color: #000000'       
-        cor_laranja =  'background-color: #f79256; color: #000000'
-        estilo_padrao = '' # Sem cor
-
-        # Llogica de aplicacao
-        if row["Arquivamento por Admissibilidade"] == "Sim":
-            return [cor_vermelha] * len(row)
-
-        criterio = row["Critério de Extração"]
-        if "objeto_principal" in criterio:
-            return [cor_verde] * len(row)
-        if "contexto_geral" in criterio:
-            return [cor_amarela] * len(row)
-        if "nenhum valor" in criterio:
-            return [cor_laranja] * len(row)
-        
-        return [estilo_padrao] * len(row)
+        return False
 
-    # aplica o estilo ao df
-    styled_df = df.style.apply(aplicar_estilo_de_linha, axis=1)
+    import pandas as pd
+    df = montar_tabela_resultados(resultados_completos)
+    estilos = classificar_estilos(df)
 
-    caminho_excel = f"{nome_arquivo_base_excel}.xlsx"
+    caminho_excel, salvo = f"{nome_arquivo_base_excel}.xlsx", False
     try:
-        # salva o df com cores no excel
-        styled_df.to_excel(caminho_excel, index=False, engine='openpyxl')
+        # as cores vão como regras de formatação condicional da planilha, e não célula a célula
+        with pd.ExcelWriter(caminho_excel, engine='openpyxl') as escritor:
+            df.to_excel(escritor, sheet_name='Sheet1', index=False)
+            adicionar_formatacao_condicional(escritor.sheets['Sheet1'], df)
         print(f"\nExcel '{caminho_excel}' salvo com sucesso!")
-    except Exception as e: 
+        salvo = True
+    except Exception as e:
         print(f"\n!!!!!!!!!!!!! Erro ao salvar Excel com cores: {e}. Tentando salvar sem cor.")
         try:
             df.to_excel(caminho_excel, index=False, engine='openpyxl')
             print(f"Excel '{caminho_excel}' salvo com sucesso, mas SEM formatação de cor.")
-        except Exception as e_simple:
-            print(f"Falha total ao salvar Excel: {e_simple}")
-            
+            salvo = True
+        except Exception as e_simple: print(f"Falha total ao salvar Excel: {e_simple}")
+    print("Linhas por cor: " + "; ".join(f"{estilo} {int(linha['count'])} (R$ {linha['sum']:,.2f})" for estilo, linha in resumir_por_estilo(df, estilos).iterrows()))
+    return salvo
+
 # --- Execução Principal ---
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Extração de valores e metadados dos processos do TCE.")
+    parser.add_argument("--workers", type=int, default=1, help="número de processos paralelos (padrão: 1, execução serial)")
+    parser.add_argument("--cache-dir", default=DIRETORIO_CACHE_PADRAO, help=f"diretório do cache de resultados (padrão: {DIRETORIO_CACHE_PADRAO})")
+    parser.add_argument("--sem-cache", action="store_true", help="ignora o cache de resultados e reprocessa todos os documentos")
+    parser.add_argument("--incremental", action="store_true", help="reprocessa apenas as subpastas alteradas desde a última execução (manifesto ao lado da planilha)")
+    parser.add_argument("--resume", action="store_true", help="retoma uma execução interrompida, pulando as subpastas já registradas no checkpoint")
+    parser.add_argument("--multi-documentos", action="store_true", help="considera todos os documentos da subpasta (não só o principal) na escolha do valor")
+    parser.add_argument("--streaming", action="store_true", help="grava cada linha assim que a subpasta termina, sem acumular resultados em memória")
+    parser.add_argument("--formato", choices=FORMATOS_SAIDA, default="xlsx", help="formato da saída em modo --streaming (padrão: xlsx)")
+    parser.add_argument("--trace", metavar="ARQUIVO.jsonl", help="grava um trace por documento (tempos por etapa, páginas, blocos, candidatos, cache)")
+    parser.add_argument("--profile", action="store_true", help="executa sob cProfile/tracemalloc e mostra os pontos quentes (use com --workers 1)")
+    parser.add_argument("--leitura-antecipada", type=int, default=PROFUNDIDADE_LEITURA_PADRAO, metavar="K", help="subpastas lidas à frente, em threads, na execução serial (padrão: %(default)s; 0 desliga)")
+    parser.add_argument("--from-text-cache", action="store_true", help="refaz só a pontuação, sobre o texto dos documentos guardado no cache (a primeira execução o preenche); ignora o cache de resultados")
+    args = parser.parse_args()
+    if args.from_text_cache and args.sem_cache: parser.error("--from-text-cache usa o diretório de cache e não pode ser combinado com --sem-cache")
+
     # 1. verifica se a pasta raiz existe para evitar erro
     if not os.path.exists(PASTA_RAIZ_PROCESSOS):
         print(f"Pasta Raiz '{PASTA_RAIZ_PROCESSOS}' não encontrada. Crie-a e adicione as subpastas dos processos.")
         exit()
     print("\n")
-    # 2. mede o tempo de execucao
+    # 2. define um nome unico e padrao para a planilha de saida (e para o manifesto do modo incremental)
+    nome_arquivo_excel_base = "extracao_final_colorida"
+    caminho_manifesto = f"{nome_arquivo_excel_base}.manifesto.json" if args.incremental else None
+    caminho_checkpoint = f"{nome_arquivo_excel_base}.checkpoint.jsonl"
+    opcoes = dict(
+        workers=args.workers, diretorio_cache=None if args.sem_cache else args.cache_dir, caminho_manifesto=caminho_manifesto,
+        caminho_checkpoint=caminho_checkpoint, retomar=args.resume, multi_documentos=args.multi_documentos,
+        caminho_traces=args.trace, leitura_antecipada=args.leitura_antecipada, texto_em_cache=args.from_text_cache
+    )
+
+    # 3. mede o tempo de execucao (com --profile, sob cProfile/tracemalloc)
     inicio = time.time()
-    # a funcao 'processar_documentos' agora retorna só os resultados, sem o "primeiro_id"
-    resultados = processar_documentos(PASTA_RAIZ_PROCESSOS)
+    resultados = None
+    with perfilar(nome_arquivo_excel_base) if args.profile else nullcontext():
+        if args.streaming:
+            # cada linha vai para o arquivo assim que a subpasta termina; nada fica acumulado em memória
+            with abrir_escritor(nome_arquivo_excel_base, args.formato, ESTILOS_LINHA) as escritor:
+                for nome_subpasta, dados in iterar_resultados(PASTA_RAIZ_PROCESSOS, **opcoes):
+                    linha = montar_linha_planilha(nome_subpasta, dados)
+                    escritor.escrever(linha, classificar_estilo_linha(linha))
+        else:
+            # a funcao 'processar_documentos' agora retorna só os resultados, sem o "primeiro_id"
+            resultados = processar_documentos(PASTA_RAIZ_PROCESSOS, **opcoes)
     fim = time.time()
     print(f"Tempo total de execução: {fim - inicio:.2f} segundos")
     print("\n------------------------------Escala de Confiança no valor classificado------------------------------\nVERDE---->Alta Confiança\nAMARELO-->Baixa Confiança\nLARANJA-->Nenhum Valor Encontrado\nVERMELHO->Arquivado por Admissibilidade\nBRANCO--->Default")
     print("-----------------------------------------------------------------------------------------------------\n\n")
-    # 3. vai que ne man
-    if not resultados:
-        print(f"Nenhuma subpasta válida encontrada ou processada em '{PASTA_RAIZ_PROCESSOS}'.")
-            
-    # 4. define um nome unico e padrao para a planilha de saida
-    nome_arquivo_excel_base = "extracao_final_colorida"
-    
-    # 5. chama a exportacao UMA UNICA VEZ com TODOS os resultados
-    exportar_para_excel(resultados, nome_arquivo_excel_base)
\ No newline at end of file
+    if not args.streaming:
+        # 4. vai que ne man
+        if not resultados:
+            print(f"Nenhuma subpasta válida encontrada ou processada em '{PASTA_RAIZ_PROCESSOS}'.")
+
+        # 5. chama a exportacao UMA UNICA VEZ com TODOS os resultados
+        if exportar_para_excel(resultados, nome_arquivo_excel_base): descartar_checkpoint(caminho_checkpoint)
+    else:
+        # o arquivo já foi gravado e fechado ao sair do `with` de abrir_escritor
+        descartar_checkpoint(caminho_checkpoint)
\ No newline at end of file
@@ -0,0 +1,67 @@
+import json
+import time
+from contextlib import contextmanager
+
+# --- Instrumentação ---
+# Traces: uma linha JSON por documento processado (tempos por etapa, páginas, blocos, candidatos,
+# cache, chamadas de LLM), gravadas pelo processo principal à medida que as subpastas terminam, para
+# achar em produção quais documentos são lentos e por quê. Perfil: `perfilar` envolve uma execução
+# inteira em cProfile + tracemalloc e mostra os pontos quentes (só o processo/thread principal é
+# medido: use --workers 1 / --serial para perfilar o processamento em si).
+TOP_PERFIL = 25
+TOP_ALOCACOES = 10
+
+class EscritorTraces:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.arquivo = open(caminho, "w", encoding="utf-8")
+
+    def escrever(self, trace):
+        if trace is None: return
+        self.arquivo.write(json.dumps(trace, ensure_ascii=False) + "\n")
+        self.arquivo.flush()
+
+    def fechar(self):
+        if not self.arquivo.closed: self.arquivo.close()
+
+def tempos_em_ms(tempos):
+    return {etapa: round(segundos * 1000, 3) for etapa, segundos in tempos.items()}
+
+class ModeloRastreado:
+    """Repassa as chamadas a um modelo (mesma interface de `llama_cpp.Llama`) e registra cada uma em `chamadas`."""
+    def __init__(self, modelo, chamadas, tipo="lote"):
+        self.modelo, self.chamadas, self.tipo = modelo, chamadas, tipo
+
+    def __getattr__(self, atributo):
+        return getattr(self.modelo, atributo)
+
+    def __call__(self, prompt, max_tokens=16, temperature=0.0):
+        inicio = time.perf_counter()
+        try: return self.modelo(prompt=prompt, max_tokens=max_tokens, temperature=temperature)
+        finally: self.chamadas.append({"tipo": self.tipo, "caracteres_prompt": len(prompt), "ms": round((time.perf_counter() - inicio) * 1000, 3)})
+
+@contextmanager
+def perfilar(caminho_base, top=TOP_PERFIL):
+    """Executa o bloco sob cProfile e tracemalloc; grava `<caminho_base>.prof` e imprime os pontos quentes."""
+    import io
+    import pstats
+    import cProfile
+    import tracemalloc
+    perfil = cProfile.Profile()
+    tracemalloc.start()
+    perfil.enable()
+    try:
+        yield perfil
+    finally:
+        perfil.disable()
+        instantaneo = tracemalloc.take_snapshot()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        perfil.dump_stats(f"{caminho_base}.prof")
+        for criterio in ["cumulative", "tottime"]:
+            saida = io.StringIO()
+            pstats.Stats(perfil, stream=saida).strip_dirs().sort_stats(criterio).print_stats(top)
+            print(f"\n--- Perfil: top {top} por {criterio} ---\n" + saida.getvalue().split("\n\n", 1)[-1].strip())
+        print(f"\n--- Memória: pico {pico / 2**20:.1f} MiB; top {TOP_ALOCACOES} alocações ainda vivas ---")
+        for estatistica in instantaneo.statistics("lineno")[:TOP_ALOCACOES]: print(estatistica)
+        print(f"\nPerfil completo gravado em '{caminho_base}.prof' (abra com `python -m pstats` ou snakeviz).")
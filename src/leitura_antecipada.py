@@ -0,0 +1,44 @@
+import os
+from collections import deque
+
+# --- Descoberta e leitura antecipada ---
+# Com a pasta raiz num compartilhamento de rede (SMB/NFS), cada listagem e cada leitura de documento
+# custa sobretudo latência. As subpastas são descobertas numa única varredura com os.scandir (o tipo
+# de cada entrada vem da própria listagem, sem um stat por entrada) e, enquanto a subpasta atual é
+# analisada, um pool pequeno de threads já lista e lê para a memória as próximas; a análise abre o
+# documento a partir dos bytes (fitz.open(stream=...)) e não espera pela rede. No máximo
+# `profundidade` itens ficam lidos à frente do consumo, o que limita a memória usada.
+PROFUNDIDADE_LEITURA_PADRAO = 4
+THREADS_LEITURA = 4
+LIMITE_BYTES_LEITURA = 64 << 20  # documentos maiores são lidos do disco na hora, sem ocupar memória antecipadamente
+
+def descobrir_subpastas(pasta_raiz):
+    """Nomes das subpastas de `pasta_raiz`, na ordem da listagem (a mesma de os.listdir)."""
+    with os.scandir(pasta_raiz) as entradas:
+        return [entrada.name for entrada in entradas if entrada.is_dir()]
+
+def ler_arquivo(caminho, limite_bytes=LIMITE_BYTES_LEITURA):
+    """Conteúdo do arquivo em bytes, ou None se passar de `limite_bytes`."""
+    with open(caminho, "rb") as arquivo:
+        if os.fstat(arquivo.fileno()).st_size > limite_bytes: return None
+        return arquivo.read()
+
+def ler_antecipadamente(itens, ler, profundidade=PROFUNDIDADE_LEITURA_PADRAO, threads=THREADS_LEITURA):
+    """
+    Gera (item, ler(item)) na ordem de `itens`, com `ler` rodando num pool de threads até
+    `profundidade` itens à frente do consumidor. Uma exceção de `ler` é relançada ao chegar ao item.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    pendentes = deque()
+    executor = ThreadPoolExecutor(max_workers=max(1, min(threads, profundidade)))
+    try:
+        for item in itens:
+            pendentes.append((item, executor.submit(ler, item)))
+            if len(pendentes) <= profundidade: continue
+            item_atual, futuro = pendentes.popleft()
+            yield item_atual, futuro.result()
+        while pendentes:
+            item_atual, futuro = pendentes.popleft()
+            yield item_atual, futuro.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
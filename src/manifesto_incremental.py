@@ -0,0 +1,44 @@
+import os
+import json
+
+# --- Modo incremental ---
+# O manifesto guarda, por subpasta, a assinatura (nome, tamanho, mtime) dos arquivos e o resultado
+# da última execução. Subpastas com a mesma assinatura (e as mesmas regras) são reaproveitadas
+# sem abrir nenhum documento; apenas as novas ou alteradas são reprocessadas.
+
+def assinatura_subpasta(caminho_subpasta):
+    """Lista ordenada [nome, tamanho, mtime_ns] dos arquivos da subpasta, obtida sem ler o conteúdo."""
+    assinatura = []
+    with os.scandir(caminho_subpasta) as entradas:
+        for entrada in entradas:
+            if entrada.is_file():
+                info = entrada.stat()
+                assinatura.append([entrada.name, info.st_size, info.st_mtime_ns])
+    return sorted(assinatura)
+
+def carregar_manifesto(caminho_manifesto):
+    if not os.path.exists(caminho_manifesto): return None
+    try:
+        with open(caminho_manifesto, encoding="utf-8") as arquivo: return json.load(arquivo)
+    except Exception as e:
+        print(f"  -> Manifesto '{caminho_manifesto}' ilegível, processando tudo: {e}")
+        return None
+
+def selecionar_inalterados(manifesto, pasta_raiz, hash_regras, assinaturas):
+    """Resultados anteriores das subpastas cuja assinatura não mudou. Vazio se a pasta raiz ou as regras mudaram."""
+    if not manifesto or manifesto.get("pasta_raiz") != os.path.abspath(pasta_raiz) or manifesto.get("hash_regras") != hash_regras:
+        return {}
+    anteriores = manifesto.get("subpastas", {})
+    return {
+        nome: anteriores[nome]["resultado"] for nome, assinatura in assinaturas.items()
+        if nome in anteriores and anteriores[nome]["arquivos"] == assinatura
+    }
+
+def salvar_manifesto(caminho_manifesto, pasta_raiz, hash_regras, assinaturas, resultados):
+    manifesto = {
+        "pasta_raiz": os.path.abspath(pasta_raiz), "hash_regras": hash_regras,
+        "subpastas": {nome: {"arquivos": assinaturas[nome], "resultado": resultado} for nome, resultado in resultados.items() if nome in assinaturas},
+    }
+    caminho_temporario = f"{caminho_manifesto}.tmp"
+    with open(caminho_temporario, "w", encoding="utf-8") as arquivo: json.dump(manifesto, arquivo, ensure_ascii=False)
+    os.replace(caminho_temporario, caminho_manifesto)
@@ -0,0 +1,47 @@
+import re
+
+# Motor de palavras-chave usado por `calcular_score_valor`.
+# As palavras-chave negativas e ponderadas são compiladas uma única vez (na importação do extrator).
+# Um regex de alternância com todas elas descarta, numa só busca, as linhas sem nenhuma palavra-chave
+# (a grande maioria); nas demais, cada padrão já compilado faz o seu próprio `search` a partir da
+# primeira ocorrência, o que dá o mesmo resultado de um `re.search` por palavra-chave (nenhum padrão
+# usa âncoras nem \b) sem o custo de recompilar/consultar o cache do `re` a cada chamada. Confirmar
+# cada ocorrência da alternância contra todos os padrões sai mais caro nas linhas densas, com muitas
+# palavras-chave (ver benchmark_extracao.py --palavras-chave).
+
+def construir_motor_palavras_chave(palavras_chave_ponderadas, palavras_chave_negativas):
+    """Compila as palavras-chave. A ordem do dict de ponderadas é preservada (define desempates)."""
+    padroes = list(palavras_chave_negativas) + list(palavras_chave_ponderadas)
+    return {
+        "varredura": re.compile("|".join(f"(?:{p})" for p in padroes)),
+        "negativas": [re.compile(p) for p in palavras_chave_negativas],
+        "ponderadas": [(re.compile(p), peso, categoria) for p, (peso, categoria) in palavras_chave_ponderadas.items()],
+    }
+
+def encontrar_palavras_chave(motor, texto_linha_lower):
+    """
+    Procura as palavras-chave na linha (já em minúsculas). Retorna (negativo, indices): `indices` são as
+    posições, na ordem do dict, das palavras-chave ponderadas encontradas (vazio se negativo).
+    """
+    match = motor["varredura"].search(texto_linha_lower)
+    if match is None: return False, ()
+    inicio = match.start()
+    for neg_kw in motor["negativas"]:
+        if neg_kw.search(texto_linha_lower, inicio): return True, ()
+    return False, tuple(indice for indice, (padrao, _, _) in enumerate(motor["ponderadas"]) if padrao.search(texto_linha_lower, inicio))
+
+def analisar_linha(motor, texto_linha_lower):
+    """
+    Retorna (negativo, pesos, melhor_categoria): `pesos` são os pesos das palavras-chave ponderadas
+    encontradas, na ordem do dict, e `melhor_categoria` é a categoria de maior peso (a primeira em
+    caso de empate).
+    """
+    negativo, encontrados = encontrar_palavras_chave(motor, texto_linha_lower)
+    if negativo: return True, (), 'negativo'
+
+    pesos, max_keyword_weight, best_keyword_category = [], 0, 'contexto_geral'
+    for indice in encontrados:
+        _, peso, categoria = motor["ponderadas"][indice]
+        pesos.append(peso)
+        if peso > max_keyword_weight: max_keyword_weight = peso; best_keyword_category = categoria
+    return False, tuple(pesos), best_keyword_category
@@ -0,0 +1,90 @@
+import sys
+import time
+import threading
+from collections import Counter
+
+# --- Progresso e métricas da execução ---
+# Substitui a barra redesenhada a cada subpasta. Em terminal, a barra (com docs/s, ETA e erros) é
+# redesenhada no máximo a cada INTERVALO_TTY segundos; com a saída redirecionada para log, uma linha
+# de resumo é emitida a cada INTERVALO_LOG segundos. Ao final sempre sai um resumo com a contagem
+# por critério. As atualizações são protegidas por trava (o pipeline com LLM as faz de outra thread);
+# com processos, os workers devolvem os resultados e só o processo principal atualiza o relatório.
+INTERVALO_TTY = 0.1
+INTERVALO_LOG = 15.0
+COMPRIMENTO_BARRA = 40
+
+def formatar_duracao(segundos):
+    if segundos is None: return "--:--"
+    minutos, segundos = divmod(int(segundos), 60)
+    horas, minutos = divmod(minutos, 60)
+    return f"{horas}:{minutos:02d}:{segundos:02d}" if horas else f"{minutos:02d}:{segundos:02d}"
+
+class RelatorioProgresso:
+    """
+    `total` itens, dos quais `concluidos` já estavam prontos (reaproveitados de cache/checkpoint e
+    fora da taxa). `interativo` (barra ou linhas de log) é detectado pela saída quando None.
+    """
+    def __init__(self, total, prefixo='Progresso:', concluidos=0, saida=None, interativo=None):
+        self.total, self.prefixo, self.saida = total, prefixo, saida or sys.stdout
+        self.interativo = self.saida.isatty() if interativo is None else interativo
+        self.iniciais = self.concluidos = concluidos
+        self.erros, self.categorias, self.sufixo, self.largura_linha = 0, Counter(), '', 0
+        self.inicio = self.ultima_saida = time.monotonic()
+        self.trava, self.finalizado = threading.Lock(), False
+        if self.interativo and self.total: self._desenhar()
+
+    def atualizar(self, sufixo='', categoria=None, erro=False):
+        with self.trava:
+            self.concluidos += 1
+            self.erros += bool(erro)
+            if categoria: self.categorias[categoria] += 1
+            self.sufixo = sufixo
+            agora = time.monotonic()
+            if agora - self.ultima_saida >= (INTERVALO_TTY if self.interativo else INTERVALO_LOG):
+                self.ultima_saida = agora
+                if self.interativo: self._desenhar()
+                else: self._escrever_linha(self._resumo())
+
+    def taxa(self):
+        decorrido = time.monotonic() - self.inicio
+        return (self.concluidos - self.iniciais) / decorrido if decorrido > 0 else 0.0
+
+    def eta(self):
+        taxa = self.taxa()
+        return (self.total - self.concluidos) / taxa if taxa > 0 else None
+
+    def _resumo(self, final=False):
+        percentual = 100 * self.concluidos / self.total if self.total else 100.0
+        tempo = f"tempo {formatar_duracao(time.monotonic() - self.inicio)}" if final else f"ETA {formatar_duracao(self.eta())}"
+        categorias = ", ".join(f"{categoria}: {n}" for categoria, n in self.categorias.most_common())
+        return (f"{self.prefixo} {self.concluidos}/{self.total} ({percentual:.1f}%) | {self.taxa():.2f} docs/s | "
+                f"{tempo} | erros: {self.erros}" + (f" | {categorias}" if categorias else ""))
+
+    def _desenhar(self):
+        preenchido = COMPRIMENTO_BARRA * self.concluidos // self.total if self.total else COMPRIMENTO_BARRA
+        barra = '█' * preenchido + '-' * (COMPRIMENTO_BARRA - preenchido)
+        linha = (f"\r{self.prefixo} |{barra}| {100 * self.concluidos / self.total:.1f}% {self.concluidos}/{self.total} "
+                 f"{self.taxa():.1f} docs/s ETA {formatar_duracao(self.eta())} erros: {self.erros} {self.sufixo}")
+        self.saida.write(linha.ljust(self.largura_linha))  # apaga o resto de uma linha anterior mais longa
+        self.largura_linha = len(linha)
+        self.saida.flush()
+
+    def _escrever_linha(self, texto):
+        self.saida.write(texto + "\n")
+        self.saida.flush()
+
+    def finalizar(self):
+        """Desenha o estado final e emite o resumo (uma única vez)."""
+        with self.trava:
+            if self.finalizado: return
+            self.finalizado = True
+            if self.interativo and self.total:
+                self._desenhar()
+                self.saida.write("\n")
+            self._escrever_linha(self._resumo(final=True))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.finalizar()
@@ -0,0 +1,119 @@
+import csv
+import json
+from contextlib import contextmanager
+
+# --- Saída em streaming ---
+# Cada linha é gravada assim que a subpasta termina, sem manter os resultados em memória.
+# CSV e JSONL são descarregados linha a linha e sobrevivem a uma interrupção abrupta; XLSX e
+# Parquet são finalizados em `fechar()`, chamado também quando a execução é interrompida.
+FORMATOS_SAIDA = ("xlsx", "csv", "jsonl", "parquet")
+
+class EscritorXlsx:
+    """Planilha em modo write-only do openpyxl; as cores de cada linha são aplicadas célula a célula."""
+    def __init__(self, caminho, estilos=None):
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, PatternFill
+        self.caminho, self.colunas = caminho, None
+        self.workbook = Workbook(write_only=True)
+        self.planilha = self.workbook.create_sheet(title="Sheet1")
+        self.estilos = {
+            nome: (PatternFill(start_color=fundo.upper(), end_color=fundo.upper(), fill_type="solid"), Font(color=fonte.upper()))
+            for nome, (fundo, fonte) in (estilos or {}).items()
+        }
+
+    def escrever(self, linha, estilo=None):
+        from openpyxl.cell import WriteOnlyCell
+        if self.colunas is None:
+            self.colunas = list(linha)
+            self.planilha.append(self.colunas)
+        if estilo not in self.estilos:
+            self.planilha.append([linha.get(coluna) for coluna in self.colunas])
+            return
+        preenchimento, fonte = self.estilos[estilo]
+        celulas = []
+        for coluna in self.colunas:
+            celula = WriteOnlyCell(self.planilha, value=linha.get(coluna))
+            celula.fill, celula.font = preenchimento, fonte
+            celulas.append(celula)
+        self.planilha.append(celulas)
+
+    def fechar(self):
+        self.workbook.save(self.caminho)
+
+class EscritorCsv:
+    def __init__(self, caminho, estilos=None):
+        self.caminho, self.colunas = caminho, None
+        self.arquivo = open(caminho, "w", newline="", encoding="utf-8-sig")
+        self.escritor = csv.writer(self.arquivo, delimiter=";")
+
+    def escrever(self, linha, estilo=None):
+        if self.colunas is None:
+            self.colunas = list(linha)
+            self.escritor.writerow(self.colunas)
+        self.escritor.writerow([linha.get(coluna) for coluna in self.colunas])
+        self.arquivo.flush()
+
+    def fechar(self):
+        self.arquivo.close()
+
+class EscritorJsonl:
+    def __init__(self, caminho, estilos=None):
+        self.caminho = caminho
+        self.arquivo = open(caminho, "w", encoding="utf-8")
+
+    def escrever(self, linha, estilo=None):
+        self.arquivo.write(json.dumps(linha, ensure_ascii=False) + "\n")
+        self.arquivo.flush()
+
+    def fechar(self):
+        self.arquivo.close()
+
+class EscritorParquet:
+    """Acumula no máximo `tamanho_lote` linhas e grava cada lote como um row group."""
+    def __init__(self, caminho, estilos=None, tamanho_lote=1000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise RuntimeError("Saída parquet requer o pacote 'pyarrow' (pip install pyarrow).") from e
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+        self.caminho, self.tamanho_lote = caminho, tamanho_lote
+        self.lote, self.schema, self.escritor = [], None, None
+
+    def escrever(self, linha, estilo=None):
+        if self.schema is None:
+            self.schema = self.pa.schema([
+                (coluna, self.pa.float64() if isinstance(valor, float) else self.pa.string()) for coluna, valor in linha.items()
+            ])
+            self.escritor = self.pq.ParquetWriter(self.caminho, self.schema)
+        self.lote.append({coluna: (valor if isinstance(valor, float) or valor is None else str(valor)) for coluna, valor in linha.items()})
+        if len(self.lote) >= self.tamanho_lote: self._gravar_lote()
+
+    def _gravar_lote(self):
+        if self.lote: self.escritor.write_table(self.pa.Table.from_pylist(self.lote, schema=self.schema))
+        self.lote = []
+
+    def fechar(self):
+        if self.escritor is None: return
+        self._gravar_lote()
+        self.escritor.close()
+
+ESCRITORES = {"xlsx": EscritorXlsx, "csv": EscritorCsv, "jsonl": EscritorJsonl, "parquet": EscritorParquet}
+
+@contextmanager
+def abrir_escritor(caminho_base, formato="xlsx", estilos=None):
+    """
+    Abre `<caminho_base>.<formato>` e garante o fechamento do arquivo (com as linhas já gravadas)
+    mesmo se o processamento for interrompido.
+    `estilos` mapeia nome do estilo -> (cor de fundo, cor da fonte) em hexadecimal, usado no XLSX.
+    """
+    if formato not in ESCRITORES: raise ValueError(f"Formato de saída desconhecido: {formato}")
+    caminho = f"{caminho_base}.{formato}"
+    escritor, concluido = ESCRITORES[formato](caminho, estilos), False
+    try:
+        yield escritor
+        concluido = True
+    finally:
+        escritor.fechar()
+        aviso = "" if concluido else " (execução interrompida; linhas gravadas até aqui preservadas)"
+        print(f"\nArquivo '{caminho}' gravado{aviso}.")
@@ -0,0 +1,123 @@
+import re
+import json
+import socket
+import argparse
+import threading
+import socketserver
+
+# --- Modelos LLM locais ---
+# Os modelos só são carregados na primeira chamada (`ModeloLocal`), de modo que importar o extrator,
+# fazer uma execução a seco ou processar uma pasta só de arquivados não custa nada. Opcionalmente, um
+# servidor local (`python servidor_modelos.py`) carrega os modelos uma única vez por máquina e os
+# mantém aquecidos entre execuções; os extratores falam com ele por socket através de `ClienteModelo`,
+# sem copiar os modelos para cada processo. `ModeloStub` responde sem modelo nenhum, para testes.
+# Os três têm a mesma interface de chamada do `llama_cpp.Llama`: modelo(prompt=..., max_tokens=..., temperature=...),
+# além de `n_ctx` e de `contar_tokens(textos)`, que conta os tokens de cada texto com o tokenizador do modelo.
+MODELOS_PADRAO = [
+    {"nome": "Llama3", "caminho": "./models/Meta-Llama-3-8B-Instruct.Q5_K_M.gguf", "n_ctx": 4096},
+    {"nome": "Phi3", "caminho": "./models/Phi-3-mini-4k-instruct-Q4_K_M.gguf", "n_ctx": 4096},
+]
+ENDERECO_PADRAO = ("127.0.0.1", 8765)
+CARACTERES_POR_TOKEN = 4  # estimativa do stub
+
+class ModeloLocal:
+    """`llama_cpp.Llama` carregado sob demanda. Chamadas concorrentes ao mesmo modelo são serializadas."""
+    def __init__(self, nome, caminho, n_ctx=4096):
+        self.nome, self.caminho, self.n_ctx = nome, caminho, n_ctx
+        self.llama, self.trava = None, threading.Lock()
+
+    def carregar(self):
+        if self.llama is None:
+            from llama_cpp import Llama
+            self.llama = Llama(model_path=self.caminho, n_ctx=self.n_ctx, verbose=False)
+        return self.llama
+
+    def __call__(self, prompt, max_tokens=16, temperature=0.0):
+        with self.trava:
+            return self.carregar()(prompt=prompt, max_tokens=max_tokens, temperature=temperature)
+
+    def contar_tokens(self, textos):
+        with self.trava:
+            llama = self.carregar()
+            return [len(llama.tokenize(texto.encode("utf-8"), add_bos=False)) for texto in textos]
+
+class ModeloStub:
+    """
+    Substituto determinístico, sem modelo: nos prompts com candidatos numerados aprova todos (o que
+    leva `selecionar_valor_via_llm` ao maior valor) e nos demais (o resumo de `fallback_resumo_llm`)
+    devolve uma resposta vazia.
+    """
+    def __init__(self, nome="Stub", n_ctx=4096, **_):
+        self.nome, self.n_ctx = nome, n_ctx
+
+    def __call__(self, prompt, max_tokens=16, temperature=0.0):
+        numeros = re.findall(r'^\[(\d+)\]', prompt, re.MULTILINE)
+        return {"choices": [{"text": ", ".join(numeros)}]}
+
+    def contar_tokens(self, textos):
+        return [len(texto) // CARACTERES_POR_TOKEN + 1 for texto in textos]
+
+class ClienteModelo:
+    """Encaminha as chamadas para um modelo do servidor local (uma conexão por chamada)."""
+    def __init__(self, nome, endereco=ENDERECO_PADRAO, n_ctx=4096, timeout=600):
+        self.nome, self.endereco, self.n_ctx, self.timeout = nome, tuple(endereco), n_ctx, timeout
+
+    def __call__(self, prompt, max_tokens=16, temperature=0.0):
+        return self._enviar({"prompt": prompt, "max_tokens": max_tokens, "temperature": temperature})
+
+    def contar_tokens(self, textos):
+        return self._enviar({"tokens": list(textos)})
+
+    def _enviar(self, pedido):
+        pedido = dict(pedido, modelo=self.nome)
+        with socket.create_connection(self.endereco, timeout=self.timeout) as conexao:
+            conexao.sendall(json.dumps(pedido, ensure_ascii=False).encode("utf-8") + b"\n")
+            with conexao.makefile("rb") as leitura: resposta = json.loads(leitura.readline())
+        if "erro" in resposta: raise RuntimeError(f"Servidor de modelos ({self.nome}): {resposta['erro']}")
+        return resposta["resposta"]
+
+def criar_modelos(configuracoes=MODELOS_PADRAO, endereco=None, stub=False):
+    """Lista [{"nome", "modelo"}] no formato de `LLM_MODELOS`; nada é carregado aqui."""
+    if stub: return [{"nome": c["nome"], "modelo": ModeloStub(c["nome"], c["n_ctx"])} for c in configuracoes]
+    if endereco: return [{"nome": c["nome"], "modelo": ClienteModelo(c["nome"], endereco, c["n_ctx"])} for c in configuracoes]
+    return [{"nome": c["nome"], "modelo": ModeloLocal(c["nome"], c["caminho"], c["n_ctx"])} for c in configuracoes]
+
+def interpretar_endereco(texto):
+    """'host:porta' ou só 'porta' -> (host, porta)."""
+    host, _, porta = texto.rpartition(":")
+    return (host or ENDERECO_PADRAO[0], int(porta))
+
+class _TratadorPedidos(socketserver.StreamRequestHandler):
+    def handle(self):
+        for linha in self.rfile:
+            try:
+                pedido = json.loads(linha)
+                modelo = self.server.modelos[pedido["modelo"]]
+                if "tokens" in pedido: resposta = {"resposta": modelo.contar_tokens(pedido["tokens"])}
+                else: resposta = {"resposta": modelo(pedido["prompt"], pedido.get("max_tokens", 16), pedido.get("temperature", 0.0))}
+            except Exception as e:
+                resposta = {"erro": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(resposta, ensure_ascii=False).encode("utf-8") + b"\n")
+
+class ServidorModelos(socketserver.ThreadingTCPServer):
+    daemon_threads, allow_reuse_address = True, True
+
+    def __init__(self, endereco, modelos):
+        super().__init__(endereco, _TratadorPedidos)
+        self.modelos = {m["nome"]: m["modelo"] for m in modelos}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor local dos modelos LLM usados por extractor_IA.py.")
+    parser.add_argument("--endereco", default=f"{ENDERECO_PADRAO[0]}:{ENDERECO_PADRAO[1]}", help="host:porta de escuta (padrão: %(default)s)")
+    parser.add_argument("--stub", action="store_true", help="responde com o modelo substituto, sem carregar os LLMs")
+    args = parser.parse_args()
+
+    modelos = criar_modelos(stub=args.stub)
+    for m in modelos:
+        if isinstance(m["modelo"], ModeloLocal):
+            print(f"Carregando {m['nome']}...")
+            m["modelo"].carregar()
+    with ServidorModelos(interpretar_endereco(args.endereco), modelos) as servidor:
+        print(f"Servidor de modelos ouvindo em {args.endereco} ({', '.join(m['nome'] for m in modelos)}). Ctrl+C para encerrar.")
+        try: servidor.serve_forever()
+        except KeyboardInterrupt: pass
@@ -0,0 +1,66 @@
+import re
+from functools import lru_cache
+
+# Conversão de valores monetários ("R$ 1.234,56", "R$ 2,5 milhões") em float.
+# `valor_do_match` é o caminho rápido usado na coleta de candidatos: lê os grupos `value` ou
+# `number`/`unit` de PADROES_VALOR_REFINADOS, já separados pelo regex, e converte numa só passada, em
+# vez das ~10 substituições por regex de `converter_valor_para_numero_refinado`, que continua sendo o
+# conversor de textos livres (respostas do LLM, resultados antigos). Os dois dão o mesmo resultado
+# para os matches dos padrões, inclusive nas peculiaridades do conversor original (ver
+# `_valor_dos_grupos`); a equivalência é conferida por `python benchmark_extracao.py --valores`.
+# Ambos guardam os resultados num memo LRU limitado: os mesmos valores se repetem muito no documento.
+TAMANHO_MEMO_VALORES = 4096
+
+MULTIPLICADORES_UNIDADE = {"mil": 1e3, "milhões": 1e6, "milhoes": 1e6, "bilhões": 1e9, "bilhoes": 1e9, "bi": 1e9, "tri": 1e12}
+
+def converter_valor_para_numero_refinado(valor_str_original):
+    """Converte uma string de valor monetário para float. Retorna (valor, erro)."""
+    if not isinstance(valor_str_original, str): 
+        return None, "Entrada não é string"
+    return _converter_texto(valor_str_original)
+
+@lru_cache(maxsize=TAMANHO_MEMO_VALORES)
+def _converter_texto(valor_str_original):
+    valor_str = valor_str_original.lower()
+    valor_str = re.sub(r"^(r\$\s*|valor\s+de\s*r\$\s*|montante\s+de\s*r\$\s*)", "", valor_str).strip()
+    valor_str = re.sub(r"(\s*\((?:.*?)\)).*$", "", valor_str).strip()
+    multiplicador = 1
+    if 'tri' in valor_str: multiplicador = 1e12; valor_str = re.sub(r'tri(?:lh[oõ]es)?', '', valor_str).strip()
+    elif 'bilh' in valor_str or ' bi' in valor_str: multiplicador = 1e9; valor_str = re.sub(r'bilh[oõ]es|bi', '', valor_str).strip()
+    elif 'milh' in valor_str: multiplicador = 1e6; valor_str = re.sub(r'milh[oõ]es', '', valor_str).strip()
+    elif 'mil' in valor_str: multiplicador = 1e3; valor_str = re.sub(r'mil', '', valor_str).strip()
+    valor_str = re.sub(r'\s+', '', valor_str)
+    if re.search(r',\d{1,2}$', valor_str): valor_str = valor_str.replace('.', '').replace(',', '.')
+    else: valor_str = valor_str.replace(',', '')
+    if '.' in valor_str:
+        parts = valor_str.split('.'); valor_str = "".join(parts[:-1]) + "." + parts[-1] if len(parts[-1]) <= 2 and len(parts) > 1 else "".join(parts)
+    valor_str = re.sub(r'[^\d\.]', '', valor_str)
+    if valor_str.count('.') > 1: valor_str = valor_str.replace('.', '', valor_str.count('.') - 1)
+    if not valor_str: return None, "String vazia após limpeza"
+    try:
+        return float(valor_str) * multiplicador, None # Retorna tupla (valor, None)
+    except (ValueError, TypeError):
+        return None, "Erro de conversão" # Retorna tupla (None, erro)
+
+def valor_do_match(match):
+    """Valor (float) de um match de PADROES_VALOR_REFINADOS; o mesmo de `converter_valor_para_numero_refinado(match.group(0))[0]`."""
+    grupos = match.groupdict()
+    if grupos.get("value") is not None: return _valor_dos_grupos(grupos["value"], None, False, False)
+    inicio_unidade = match.start("unit")
+    return _valor_dos_grupos(grupos["number"], grupos["unit"].lower(), match.string[inicio_unidade - 1] == " ", match.end() > match.end("unit"))
+
+@lru_cache(maxsize=TAMANHO_MEMO_VALORES)
+def _valor_dos_grupos(numero, unidade, espaco_antes_unidade, texto_apos_unidade):
+    """
+    `numero` usa "." como milhar e "," como decimal (ou "_"/"." como milhar e um decimal curto com
+    "." antes de unidade). Peculiaridades do conversor original mantidas: "bi" colado ao número não é
+    reconhecido como bilhão (fica multiplicador 1) e, quando sobra texto depois do número (" de reais"
+    ou esse "bi"), a vírgula/ponto decimal é descartada ("R$ 1,5 milhões de reais" -> 15 milhões).
+    """
+    if unidade is None:
+        inteiro, _, decimal = numero.partition(",")
+        return float(inteiro.replace(".", "").replace("_", "") + ("." + decimal if decimal else ""))
+    bi_colado = unidade == "bi" and not espaco_antes_unidade
+    multiplicador = 1 if bi_colado else MULTIPLICADORES_UNIDADE[unidade]
+    if texto_apos_unidade or bi_colado: return float(numero.replace(",", "").replace(".", "")) * multiplicador
+    return float(numero.replace(",", ".")) * multiplicador
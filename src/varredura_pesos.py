@@ -0,0 +1,252 @@
+import os
+import json
+import math
+import time
+import argparse
+import importlib
+from itertools import product
+
+import numpy as np
+
+from cache_resultados import DIRETORIO_CACHE_PADRAO, calcular_hash_arquivo
+from motor_palavras_chave import encontrar_palavras_chave
+from valores_monetarios import valor_do_match
+from leitura_antecipada import descobrir_subpastas
+from comparar_variantes import (
+    PASTA_CORPUS_PADRAO, CAMINHO_GABARITO_PADRAO, carregar_gabarito, campo_correto, categoria_do_criterio,
+    avisar_nao_revisadas
+)
+
+# --- Varredura de pesos da hierarquia ---
+# Avalia milhares de configurações de PALAVRAS_CHAVE_PONDERADAS contra o gabarito sem rodar o extrator
+# uma vez por configuração. Os candidatos a valor do documento principal de cada subpasta são extraídos
+# uma única vez como uma matriz de atributos (termo do valor log10(v + 1) / 10, máscara de bits das
+# palavras-chave da linha, seção de decisão, linha negativa); a pontuação de `pontuar_valor`, a
+# categoria da linha e a hierarquia de CATEGORIAS_PRIORITARIAS (`melhores_por_categoria` +
+# `escolher_por_hierarquia`, com os mesmos desempates) são então aplicadas a todas as configurações
+# de uma vez, com operações de matriz do NumPy. As configurações são os pesos de cada variante e uma
+# grade de fatores por categoria sobre os pesos da variante base; o ranking é pela acurácia do valor,
+# depois da categoria, e por fim pela menor mudança em relação aos pesos atuais. Só as subpastas com
+# entrada revisada no gabarito são lidas e avaliadas: as demais entradas foram geradas pela própria
+# variante noAI, que ficaria em primeiro por construção. Sem nenhuma revisada, a varredura não roda.
+VARIANTES_PESOS = {"noAI": "extractor_noAI", "color": "extractor_noAI_color"}
+FATORES_PADRAO = [0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 2.0]
+BONUS_SECAO_DECISAO = 1.0  # somado por `pontuar_valor` aos candidatos sancao_direta em seção de decisão
+LOTE_CONFIGURACOES = 512
+TOP_PADRAO = 10
+
+def carregar_documento_principal(extrator, caminho_documento, diretorio_cache=None):
+    """Como em `analisar_documento`; com `diretorio_cache`, o texto vem do cache de texto (ver cache_texto.py)."""
+    if not diretorio_cache: return extrator.carregar_documento(caminho_documento, completo=False)
+    return extrator.carregar_documento_cache_texto(caminho_documento, diretorio_cache, calcular_hash_arquivo(caminho_documento))[0]
+
+def extrair_atributos(extrator, pasta_corpus, diretorio_cache=None, subpastas=None):
+    """
+    Percorre as subpastas (só as de `subpastas`, se informado) uma única vez. Retorna (fixos, documentos, candidatos): `fixos` traz
+    {nome: {"criterio", "status"}} das subpastas cujo resultado não depende dos pesos (sem documento,
+    arquivadas, sem candidatos...); `documentos` lista as demais, na ordem das subpastas; `candidatos`
+    é um dict de arrays com um elemento por candidato, agrupados por documento na mesma ordem.
+    """
+    fixos, documentos = {}, []
+    colunas = {coluna: [] for coluna in ["documento", "termo_valor", "mascara", "secao_decisao", "negativo", "valor_str"]}
+    for nome in descobrir_subpastas(pasta_corpus):
+        if subpastas is not None and nome not in subpastas: continue
+        caminho_subpasta = os.path.join(pasta_corpus, nome)
+        arquivos = extrator.listar_documentos(caminho_subpasta)
+        if not arquivos: fixos[nome] = {"criterio": "documento nao encontrado", "status": "Indeterminado"}; continue
+        documento = carregar_documento_principal(extrator, os.path.join(caminho_subpasta, arquivos[0]), diretorio_cache)
+        if documento is None: fixos[nome] = {"criterio": "erro_leitura_conteudo", "status": "Indeterminado"}; continue
+        status = extrator.verificar_admissibilidade_e_arquivamento(documento["paragrafos_finais"])
+        if status == "Sim": fixos[nome] = {"criterio": "Sim", "status": status}; continue
+        if not documento["paragrafos"]: fixos[nome] = {"criterio": "lista de parágrafos vazia", "status": status}; continue
+
+        total_antes = len(colunas["documento"])
+        for linha_texto in documento["paragrafos"][:extrator.MAX_PARAGRAPH_ETAPA_2]:
+            linha_texto = linha_texto.strip()
+            if not linha_texto: continue
+            contexto_linha = None
+            for padrao_regex in extrator.PADROES_VALOR_COMPILADOS:
+                for match in padrao_regex.finditer(linha_texto):
+                    valor_num = valor_do_match(match)
+                    if valor_num <= 0: continue
+                    if contexto_linha is None:
+                        negativo, indices = encontrar_palavras_chave(extrator.MOTOR_PALAVRAS_CHAVE, linha_texto.lower())
+                        contexto_linha = (sum(1 << indice for indice in indices), extrator.RE_SECOES_DECISAO.search(linha_texto) is not None, negativo)
+                    for coluna, valor in zip(["documento", "termo_valor", "mascara", "secao_decisao", "negativo", "valor_str"],
+                                             [len(documentos), math.log10(valor_num + 1) / 10, *contexto_linha, match.group(0)]):
+                        colunas[coluna].append(valor)
+        if len(colunas["documento"]) == total_antes: fixos[nome] = {"criterio": "nenhum valor relevante encontrado", "status": status}
+        else: documentos.append(nome)
+
+    candidatos = {
+        "documento": np.array(colunas["documento"], dtype=np.int64), "termo_valor": np.array(colunas["termo_valor"], dtype=np.float64),
+        "mascara": np.array(colunas["mascara"], dtype=np.uint64), "secao_decisao": np.array(colunas["secao_decisao"], dtype=bool),
+        "negativo": np.array(colunas["negativo"], dtype=bool), "valor_str": colunas["valor_str"],
+    }
+    return fixos, documentos, candidatos
+
+def escolher_candidatos(pesos, candidatos, categorias_palavras, hierarquia):
+    """
+    Núcleo vetorizado. `pesos`: matriz (configurações x palavras-chave). Retorna (escolhido, categoria),
+    ambos (documentos x configurações): o índice do candidato escolhido e a posição da sua categoria
+    em `hierarquia`, ou -1 quando nenhum candidato é válido. Os pesos são somados um a um, na ordem
+    do dict, como em `pontuar_valor`, para que os scores (e, portanto, os empates) sejam idênticos.
+    """
+    n_candidatos, n_configuracoes = len(candidatos["termo_valor"]), len(pesos)
+    bits = (candidatos["mascara"][:, None] >> np.arange(pesos.shape[1], dtype=np.uint64)) & np.uint64(1)
+    acertos = bits.astype(bool)
+    score = np.repeat(candidatos["termo_valor"][:, None], n_configuracoes, axis=1)
+    maior_peso = np.zeros((n_candidatos, n_configuracoes))
+    categoria = np.full((n_candidatos, n_configuracoes), hierarquia.index('contexto_geral'), dtype=np.int64)
+    for indice, codigo in enumerate(categorias_palavras):
+        presente, peso = acertos[:, indice:indice + 1], pesos[:, indice]
+        score = score + np.where(presente, peso, 0.0)
+        supera = presente & (peso > maior_peso)  # a categoria é a da palavra-chave de maior peso (a primeira no empate)
+        maior_peso = np.where(supera, peso, maior_peso)
+        categoria = np.where(supera, codigo, categoria)
+    score = score + np.where(candidatos["secao_decisao"][:, None] & (categoria == hierarquia.index('sancao_direta')), BONUS_SECAO_DECISAO, 0.0)
+    valido = (score > 0) & ~candidatos["negativo"][:, None]
+
+    # cada documento é um trecho contíguo de candidatos; o máximo e o primeiro índice que o atinge saem por reduceat
+    inicios = np.flatnonzero(np.r_[True, np.diff(candidatos["documento"]) != 0])
+    linhas = np.arange(n_candidatos)[:, None]
+    escolhido = np.full((len(inicios), n_configuracoes), -1, dtype=np.int64)
+    categoria_escolhida = np.full((len(inicios), n_configuracoes), -1, dtype=np.int64)
+    for codigo in reversed(range(len(hierarquia))):  # da menor para a maior prioridade: a última atribuição prevalece
+        na_categoria = valido & (categoria == codigo)
+        score_categoria = np.where(na_categoria, score, -np.inf)
+        maximo = np.maximum.reduceat(score_categoria, inicios, axis=0)
+        primeiro = np.minimum.reduceat(np.where(na_categoria & (score_categoria == maximo[candidatos["documento"]]), linhas, n_candidatos), inicios, axis=0)
+        tem_candidato = primeiro < n_candidatos
+        escolhido = np.where(tem_candidato, primeiro, escolhido)
+        categoria_escolhida = np.where(tem_candidato, codigo, categoria_escolhida)
+    return escolhido, categoria_escolhida
+
+def pesos_da_variante(extrator, palavras_chave):
+    ponderadas = extrator.PALAVRAS_CHAVE_PONDERADAS
+    if list(ponderadas) != palavras_chave: return None
+    return np.array([ponderadas[padrao][0] for padrao in palavras_chave], dtype=np.float64)
+
+def gerar_configuracoes(extrator_base, variante_base, fatores):
+    """
+    Matriz (configurações x palavras-chave) e a descrição de cada linha: os pesos das variantes (a base
+    primeiro) e a grade de um fator por categoria aplicado aos pesos da base. Linhas repetidas são removidas.
+    """
+    palavras_chave = list(extrator_base.PALAVRAS_CHAVE_PONDERADAS)
+    categorias = list(dict.fromkeys(categoria for _, categoria in extrator_base.PALAVRAS_CHAVE_PONDERADAS.values()))
+    linhas, descricoes = [], []
+    for variante in sorted(VARIANTES_PESOS, key=lambda v: v != variante_base):
+        pesos = pesos_da_variante(importlib.import_module(VARIANTES_PESOS[variante]), palavras_chave)
+        if pesos is None: print(f"Variante '{variante}' ignorada: palavras-chave diferentes das de '{variante_base}'."); continue
+        linhas.append(pesos[None, :]); descricoes.append({"origem": variante})
+    base = linhas[0][0]
+    grade = np.array(list(product(fatores, repeat=len(categorias))), dtype=np.float64)
+    indice_categoria = [categorias.index(categoria) for _, categoria in extrator_base.PALAVRAS_CHAVE_PONDERADAS.values()]
+    linhas.append(base[None, :] * grade[:, indice_categoria])
+    descricoes += [{"origem": "grade", "fatores": dict(zip(categorias, map(float, linha)))} for linha in grade]
+    pesos = np.vstack(linhas)
+    _, primeiras = np.unique(pesos, axis=0, return_index=True)
+    primeiras.sort()
+    return pesos[primeiras], [descricoes[i] for i in primeiras]
+
+def avaliar_configuracoes(pesos, fixos, documentos, candidatos, gabarito, categorias_palavras, hierarquia, lote=LOTE_CONFIGURACOES):
+    """Acertos de valor e de categoria de cada configuração sobre as subpastas do gabarito (mesmos critérios de `comparar_variantes.avaliar`)."""
+    acertos_valor, acertos_categoria = np.zeros(len(pesos), dtype=np.int64), np.zeros(len(pesos), dtype=np.int64)
+    # subpastas cujo resultado não depende dos pesos: somadas uma vez
+    indice_documento = {nome: i for i, nome in enumerate(documentos)}
+    for nome, esperado in gabarito.items():
+        if nome in indice_documento: continue
+        fixo = fixos.get(nome)
+        acertos_valor += campo_correto("valor", esperado["valor"], None)
+        acertos_categoria += esperado["categoria"] == (categoria_do_criterio(fixo["criterio"], fixo["status"]) if fixo else "ausente")
+    # demais: acerto de cada candidato e da ausência de valor, por documento; categoria esperada como posição na hierarquia
+    avaliados = [i for i, nome in enumerate(documentos) if nome in gabarito]
+    esperados = [gabarito[documentos[i]] for i in avaliados]
+    candidato_correto = np.array([campo_correto("valor", gabarito[documentos[d]]["valor"], valor_str) if documentos[d] in gabarito else False
+                                  for d, valor_str in zip(candidatos["documento"], candidatos["valor_str"])])
+    sem_valor_correto = np.array([campo_correto("valor", e["valor"], None) for e in esperados], dtype=bool)
+    sem_valor_categoria = np.array([e["categoria"] == "nenhum valor relevante encontrado" for e in esperados], dtype=bool)
+    categoria_esperada = np.array([hierarquia.index(e["categoria"]) if e["categoria"] in hierarquia else -2 for e in esperados])
+    for inicio in range(0, len(pesos), lote):
+        escolhido, categoria = escolher_candidatos(pesos[inicio:inicio + lote], candidatos, categorias_palavras, hierarquia)
+        escolhido, categoria = escolhido[avaliados], categoria[avaliados]
+        acertos_valor[inicio:inicio + lote] += np.where(escolhido >= 0, candidato_correto[escolhido], sem_valor_correto[:, None]).sum(axis=0)
+        acertos_categoria[inicio:inicio + lote] += np.where(categoria >= 0, categoria == categoria_esperada[:, None], sem_valor_categoria[:, None]).sum(axis=0)
+    return acertos_valor, acertos_categoria
+
+def executar_varredura(variante_base="noAI", pasta_corpus=PASTA_CORPUS_PADRAO, gabarito=None, fatores=FATORES_PADRAO, diretorio_cache=None):
+    """
+    Retorna o relatório: configurações ordenadas (melhor primeiro) com acurácias, mudança em relação à
+    base e pesos. `gabarito`: entradas do gabarito (padrão: CAMINHO_GABARITO_PADRAO); só as revisadas
+    são avaliadas.
+    """
+    extrator = importlib.import_module(VARIANTES_PESOS[variante_base])
+    if gabarito is None: gabarito = carregar_gabarito(CAMINHO_GABARITO_PADRAO)
+    gabarito = entradas_revisadas(gabarito)
+    if not gabarito: raise ValueError("nenhuma entrada revisada no gabarito")
+    inicio = time.perf_counter()
+    fixos, documentos, candidatos = extrair_atributos(extrator, pasta_corpus, diretorio_cache, set(gabarito))
+    segundos_extracao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    hierarquia = list(extrator.CATEGORIAS_PRIORITARIAS)
+    categorias_palavras = [hierarquia.index(categoria) for _, categoria in extrator.PALAVRAS_CHAVE_PONDERADAS.values()]
+    pesos, descricoes = gerar_configuracoes(extrator, variante_base, fatores)
+    acertos_valor, acertos_categoria = avaliar_configuracoes(pesos, fixos, documentos, candidatos, gabarito, categorias_palavras, hierarquia)
+    mudanca = np.abs(pesos - pesos[0]).sum(axis=1)
+    ordem = np.lexsort((mudanca, -acertos_categoria, -acertos_valor))
+    segundos_avaliacao = time.perf_counter() - inicio
+
+    palavras_chave = list(extrator.PALAVRAS_CHAVE_PONDERADAS.items())
+    configuracoes = [dict(
+        descricoes[i], posicao=posicao, acuracia_valor=round(acertos_valor[i] / len(gabarito), 4),
+        acuracia_categoria=round(acertos_categoria[i] / len(gabarito), 4), mudanca=round(float(mudanca[i]), 4),
+        pesos={padrao: [float(peso), categoria] for (padrao, (_, categoria)), peso in zip(palavras_chave, pesos[i])},
+    ) for posicao, i in enumerate(ordem, start=1)]
+    return {
+        "variante_base": variante_base, "subpastas": len(gabarito), "candidatos": len(candidatos["valor_str"]),
+        "tempo_extracao_s": round(segundos_extracao, 3), "tempo_avaliacao_s": round(segundos_avaliacao, 3),
+        "configuracoes": configuracoes,
+    }
+
+def entradas_revisadas(gabarito):
+    """Só as entradas revisadas (vazio se não houver nenhuma): aqui não há recurso à concordância com o gabarito gerado."""
+    return {nome: entrada for nome, entrada in gabarito.items() if entrada.get("revisado")}
+
+def descrever_configuracao(configuracao):
+    if configuracao["origem"] != "grade": return f"pesos de '{configuracao['origem']}'"
+    return " ".join(f"{categoria}×{fator:g}" for categoria, fator in configuracao["fatores"].items())
+
+def imprimir_ranking(relatorio, top=TOP_PADRAO):
+    configuracoes = relatorio["configuracoes"]
+    print(f"Base '{relatorio['variante_base']}': {relatorio['subpastas']} subpastas revisadas no gabarito, {relatorio['candidatos']} candidatos "
+          f"(extração {relatorio['tempo_extracao_s']:.2f} s); {len(configuracoes)} configurações avaliadas em {relatorio['tempo_avaliacao_s']:.2f} s.\n")
+    print(f"{'#':>5} {'valor':>7} {'categoria':>10} {'mudança':>8}  configuração (acurácia)")
+    referencias = [c for c in configuracoes if c["origem"] != "grade"]
+    for configuracao in configuracoes[:top] + [c for c in referencias if c["posicao"] > top]:
+        print(f"{configuracao['posicao']:>5} {100 * configuracao['acuracia_valor']:>6.1f}% {100 * configuracao['acuracia_categoria']:>9.1f}% "
+              f"{configuracao['mudanca']:>8.2f}  {descrever_configuracao(configuracao)}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Varre configurações de pesos das palavras-chave e as ordena pela acurácia contra o gabarito.")
+    parser.add_argument("--variante-base", choices=list(VARIANTES_PESOS), default="noAI", help="variante cujas regras e pesos servem de base (padrão: noAI)")
+    parser.add_argument("--fatores", nargs="+", type=float, default=FATORES_PADRAO, help="fatores aplicados aos pesos de cada categoria na grade (padrão: %(default)s)")
+    parser.add_argument("--pasta", default=PASTA_CORPUS_PADRAO, help="pasta raiz do corpus (padrão: arquivos_teste)")
+    parser.add_argument("--gabarito", default=CAMINHO_GABARITO_PADRAO, help="arquivo do gabarito (padrão: arquivos_teste/gabarito.json)")
+    parser.add_argument("--cache-dir", default=DIRETORIO_CACHE_PADRAO, help=f"diretório do cache de texto dos documentos (padrão: {DIRETORIO_CACHE_PADRAO})")
+    parser.add_argument("--sem-cache", action="store_true", help="lê os documentos sem usar nem preencher o cache de texto")
+    parser.add_argument("--top", type=int, default=TOP_PADRAO, help="configurações mostradas (padrão: %(default)s)")
+    parser.add_argument("--saida", help="grava em JSON todas as configurações ordenadas, com os pesos de cada uma")
+    args = parser.parse_args()
+
+    gabarito = carregar_gabarito(args.gabarito)
+    if not entradas_revisadas(gabarito):
+        print("Varredura cancelada: nenhuma entrada revisada no gabarito. As não revisadas foram geradas pela variante noAI, "
+              "e o ranking só mediria a concordância com ela. Revise entradas (\"revisado\": true) antes de varrer os pesos.")
+        raise SystemExit(1)
+    avisar_nao_revisadas(gabarito)
+    relatorio = executar_varredura(args.variante_base, args.pasta, gabarito, args.fatores, None if args.sem_cache else args.cache_dir)
+    imprimir_ranking(relatorio, args.top)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo: json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nRelatório gravado em '{args.saida}'.")